@@ -0,0 +1,306 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Los libros xlsx se miden con el cierre de años activo
+os.environ.setdefault("GESTIONAPP_CIERRE_DIAS", "60")
+
+from gestion.api import write_book_report
+from gestion.model import Transaction, format_monto
+from gestion.rollups import PeriodRollups
+from gestion.storage import open_store, write_xlsx
+from gestion.widgets import VirtualTable
+
+# Mide carga, guardado, refresco de la tabla, filtrado por período y
+# reporte sobre libros sintéticos. Uso:
+#   python benchmarks/run.py --tamanos 1000 100000 --salida baseline.json
+#   python benchmarks/run.py --comparar baseline.json
+
+TAMANOS = (1_000, 100_000, 1_000_000)
+CATEGORIAS = ("Sueldo", "Ventas", "Alquiler", "Comida", "Transporte", "Servicios",
+              "Impuestos", "Salud", "Educación", "Varios")
+PALABRAS = ("pago", "compra", "factura", "cliente", "proveedor", "mensual", "tarjeta",
+            "transferencia", "efectivo", "sucursal", "pedido", "cuota")
+# Diez años de datos que terminan hoy: los anteriores se archivan al cargar
+FECHA_FIN = date.today()
+DIAS = 3650
+# Los casos más rápidos que esto se repiten y se toma el mejor tiempo; por
+# debajo de MIN_SEGUNDOS no se informan regresiones (es ruido)
+REPETIR_BAJO = 0.1
+REPETICIONES = 5
+MIN_SEGUNDOS = 0.005
+
+
+def make_ledger(n, seed=0):
+    rng = random.Random(seed)
+    inicio = FECHA_FIN - timedelta(days=DIAS - 1)
+    for _ in range(n):
+        tipo = "Ingreso" if rng.random() < 0.3 else "Gasto"
+        yield Transaction(
+            inicio + timedelta(days=rng.randrange(DIAS)),
+            tipo,
+            rng.choice(CATEGORIAS),
+            rng.randrange(100, 5_000_000),
+            " ".join(rng.choice(PALABRAS) for _ in range(rng.randrange(1, 12))),
+            "%032x" % rng.getrandbits(128)
+        )
+
+
+class TreeStandIn:
+    # Lo que VirtualTable usa de ttk.Treeview, sin Tk: los items viven en
+    # un diccionario y el alto es fijo
+    def __init__(self, height):
+        self.height = height
+        self.items = {}
+
+    def insert(self, parent, index, iid, values):
+        self.items[iid] = values
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.items[iid]
+
+    def get_children(self):
+        return tuple(self.items)
+
+    def exists(self, iid):
+        return iid in self.items
+
+    def item(self, iid, values):
+        self.items[iid] = values
+
+    def winfo_height(self):
+        return self.height
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def selection_set(self, iid):
+        pass
+
+
+class ScrollbarStandIn:
+    def set(self, first, last):
+        pass
+
+
+class HeadlessTable(VirtualTable):
+    # VirtualTable real sobre el Treeview de prueba; no crea el Frame de Tk
+    def __init__(self, values, key, visible_rows=30):
+        self.values = values
+        self.key = key
+        self.rows = []
+        self.first = 0
+        self.selected_index = None
+        self._window = (0, 0)
+        self._rowheight = 20
+        self.tree = TreeStandIn((visible_rows + 1) * self._rowheight)
+        self.scrollbar = ScrollbarStandIn()
+
+
+def row_values(transaction):
+    # Igual que FinanceApp.row_values
+    return (
+        transaction.fecha.isoformat(),
+        transaction.tipo,
+        transaction.categoria,
+        format_monto(transaction.monto),
+        transaction.descripcion
+    )
+
+
+def period_range(periodo, today):
+    # Igual que FinanceApp.get_period_range, con "hoy" fijo
+    today = datetime.combine(today, datetime.min.time())
+    if periodo == "Día":
+        return today, today + timedelta(days=1)
+    if periodo == "Semana":
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(weeks=1)
+    if periodo == "Mes":
+        start = today.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    return today.replace(year=1980, day=1), datetime.max
+
+
+def measure(fn, memory, once=False):
+    # Devuelve (segundos, pico en MB o None). Con memory el caso corre una
+    # segunda vez bajo tracemalloc, para que su costo no altere el tiempo.
+    # Los casos que cambian el libro (once) corren una sola vez
+    seconds = None
+    for _ in range(1 if once else REPETICIONES):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+        if elapsed >= REPETIR_BAJO:
+            break
+
+    peak = None
+    if memory and not once:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_size(n, backend, workdir, memory, log):
+    results = []
+
+    def record(caso, fn, filas=None, once=False):
+        seconds, peak = measure(fn, memory, once)
+        results.append({"tamano": n, "backend": backend, "caso": caso, "segundos": round(seconds, 4),
+                        "pico_mb": None if peak is None else round(peak, 2), "filas": filas})
+        log(f"{n:>9} {backend:<6} {caso:<26} {seconds:9.3f} s"
+            + ("" if peak is None else f" {peak:9.1f} MB"))
+
+    # Nombre propio por backend: SqliteStore importaría el xlsx del mismo nombre
+    base = os.path.join(workdir, f"libro_{n}_{backend}")
+    filename = base + (".db" if backend == "sqlite" else ".xlsx")
+    ledger = list(make_ledger(n))
+
+    # Libro inicial: para xlsx se escribe con la misma función que usa el guardado
+    if backend == "xlsx":
+        record("save (write_xlsx)", lambda: write_xlsx(filename, ledger), n)
+    else:
+        store = open_store(filename)
+        store.load()
+        store.add_many(ledger)
+        store.close()
+    del ledger
+
+    def load_cold():
+        if os.path.exists(base + ".snapshot"):
+            os.remove(base + ".snapshot")
+        store = open_store(filename)
+        store.load()
+        store.close()
+
+    def load_warm():
+        store = open_store(filename)
+        store.load()
+        store.close()
+
+    if backend == "xlsx":
+        # Primera carga: pasa los años cerrados al archivo
+        record("load (cierre de años)", load_cold, n, once=True)
+    record("load_transactions", load_cold, n)
+    if backend == "xlsx":
+        # Con la instantánea que dejó la carga anterior
+        load_warm()
+        record("load (snapshot)", load_warm, n)
+
+    def load_archive():
+        store = open_store(filename)
+        store.load()
+        store.ensure_loaded(date.min, date.max)
+        store.close()
+
+    record("load archivo completo", load_archive, n)
+
+    store = open_store(filename)
+    store.load()
+    today = FECHA_FIN - timedelta(days=10)
+
+    def rollups():
+        result = PeriodRollups.from_transactions(store.resident_transactions())
+        for archived in store.archived_rollups():
+            result.merge(archived)
+
+    record("rollups", rollups, n)
+
+    for periodo in ("Día", "Semana", "Mes", "Mostrar todo"):
+        start, end = period_range(periodo, today)
+        record(f"filter {periodo}", lambda: store.range(start, end), store.count(start, end))
+
+        table = HeadlessTable(row_values, key=lambda t: t.fecha)
+        record(f"update_table {periodo}", lambda: table.set_rows(store.range(start, end)),
+               store.count(start, end))
+
+    def edit_cycle():
+        t = Transaction(today, "Gasto", "Varios", 1234, "benchmark")
+        store.add(t)
+        store.update(t.id, Transaction(today, "Gasto", "Varios", 4321, "benchmark"))
+        store.remove(t.id)
+
+    record("add/update/remove", edit_cycle, 1)
+    record("save_transactions", store.compact, n)
+
+    start, end = today.replace(day=1), today
+    record("report mes", lambda: write_book_report(store, os.path.join(workdir, "mes.pdf"), start, end),
+           store.count(start, end + timedelta(days=1)))
+    start = date(today.year, 1, 1)
+    record("report año", lambda: write_book_report(store, os.path.join(workdir, "anio.pdf"), start, end),
+           store.count(start, end + timedelta(days=1)))
+    store.close()
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    # Casos cuyo tiempo superó la línea base en más de tolerance (0.25 = 25 %)
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["tamano"], r["backend"], r["caso"]): r for r in json.load(f)["resultados"]
+        }
+
+    regressions = []
+    for r in results:
+        old = baseline.get((r["tamano"], r["backend"], r["caso"]))
+        if old is None or max(old["segundos"], r["segundos"]) < MIN_SEGUNDOS:
+            continue
+        ratio = r["segundos"] / max(old["segundos"], MIN_SEGUNDOS)
+        if ratio > 1 + tolerance:
+            regressions.append((r, old, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de Gestionapp")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS))
+    parser.add_argument("--backend", choices=("xlsx", "sqlite"), nargs="+", default=["xlsx", "sqlite"])
+    parser.add_argument("--salida", help="JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de línea base contra el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir el pico de memoria")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.tamanos:
+            for backend in args.backend:
+                results += bench_size(n, backend, workdir, not args.sin_memoria, print)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "resultados": results
+            }, f, ensure_ascii=False, indent=2)
+
+    if args.comparar:
+        regressions = compare(results, args.comparar, args.tolerancia)
+        for r, old, ratio in regressions:
+            print(f"REGRESIÓN {r['tamano']} {r['backend']} {r['caso']}: "
+                  f"{old['segundos']:.3f} s -> {r['segundos']:.3f} s ({ratio:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
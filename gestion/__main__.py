@@ -0,0 +1,205 @@
+import argparse
+import sys
+from datetime import timedelta
+from gestion.model import format_monto, parse_fecha
+
+# Errores de filas que se muestran antes de resumir el resto
+MAX_ERRORES = 20
+
+# Cada comando importa lo que necesita al correr, así la ayuda y los demás
+# comandos no cargan openpyxl ni FPDF
+
+
+def cmd_import(args):
+    from gestion.api import load_book
+    from gestion.importers import import_statement, rows_per_second
+
+    store = load_book(args.libro)
+    rejected = 0
+    try:
+        for path in args.archivos:
+            result = import_statement(path, store, args.encoding)
+            rejected += len(result.errores)
+            print(f"{path}: {len(result.agregadas)} agregadas, {result.duplicadas} duplicadas, "
+                  f"{len(result.errores)} con errores ({rows_per_second(result):,.0f} filas/s)")
+            for line, message in result.errores[:MAX_ERRORES]:
+                print(f"  línea {line}: {message}", file=sys.stderr)
+            if len(result.errores) > MAX_ERRORES:
+                print(f"  ... y {len(result.errores) - MAX_ERRORES} más", file=sys.stderr)
+
+        # Un solo guardado para todos los archivos
+        store.compact()
+    finally:
+        store.close()
+    return 1 if rejected else 0
+
+
+def cmd_report(args):
+    from gestion.api import default_report_path, load_book, write_book_report
+
+    try:
+        store = load_book(args.libro, read_only=True)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        if not store.count(args.desde, args.hasta + timedelta(days=1)):
+            print("No hay transacciones en el rango seleccionado", file=sys.stderr)
+            return 1
+
+        path = args.salida or default_report_path()
+        resumen = write_book_report(store, path, args.desde, args.hasta)
+    finally:
+        store.close()
+
+    print(f"Reporte generado: {path}")
+    print(f"Ingresos: {format_monto(resumen.ingresos)}  Gastos: {format_monto(resumen.gastos)}  "
+          f"Ganancia: {format_monto(resumen.ganancia)}  Margen: {resumen.margen:.1f}%")
+    return 0
+
+
+def cmd_batch(args):
+    import csv
+    import os
+    from gestion.batch import job_for, run_batch, write_summary
+
+    jobs = [job_for(libro, args.desde, args.hasta, args.directorio) for libro in args.libros]
+    if args.lista:
+        # Lista CSV con filas libro,desde,hasta
+        with open(args.lista, newline="", encoding="utf-8") as f:
+            for line, row in enumerate(csv.reader(f), 1):
+                if not row or not row[0].strip() or row[0].startswith("#"):
+                    continue
+                if len(row) != 3:
+                    print(f"{args.lista}, línea {line}: se esperan tres columnas libro,desde,hasta",
+                          file=sys.stderr)
+                    return 2
+                try:
+                    desde, hasta = fecha_arg(row[1]), fecha_arg(row[2])
+                except argparse.ArgumentTypeError as e:
+                    print(f"{args.lista}, línea {line}: {e}", file=sys.stderr)
+                    return 2
+                jobs.append(job_for(row[0].strip(), desde, hasta, args.directorio))
+    if not jobs:
+        print("No se indicó ningún libro", file=sys.stderr)
+        return 2
+    for job in jobs:
+        if job.desde > job.hasta:
+            print(f"{job.libro}: la fecha de inicio debe ser anterior a la fecha final", file=sys.stderr)
+            return 2
+
+    os.makedirs(args.directorio, exist_ok=True)
+
+    def report(result):
+        if result.error:
+            estado = f"error: {result.error}"
+        elif result.totales is None:
+            estado = "sin transacciones en el rango"
+        else:
+            estado = f"{result.cantidad} transacciones -> {result.job.salida}"
+        print(f"{result.job.libro}: {estado} ({result.segundos:.1f} s)")
+
+    results = run_batch(jobs, args.procesos, on_result=report)
+    resumen = args.resumen or os.path.join(args.directorio, "Resumen.csv")
+    write_summary(resumen, results)
+    print(f"Resumen consolidado: {resumen}")
+    return 1 if any(r.error for r in results) else 0
+
+
+def cmd_reopen(args):
+    from gestion.api import load_book
+
+    try:
+        store = load_book(args.libro)
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        if not hasattr(store, "reopen"):
+            print("Solo los libros .xlsx archivan años cerrados", file=sys.stderr)
+            return 2
+        store.reopen(args.año)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    print(f"El año {args.año} volvió a {args.libro} y se puede modificar")
+    return 0
+
+
+def cmd_serve(args):
+    import asyncio
+    from gestion.server import serve
+
+    def ready(server):
+        where = args.socket or f"{args.host}:{args.puerto}"
+        print(f"Sirviendo {args.libro} en {where} (Ctrl+C para guardar y salir)")
+
+    try:
+        asyncio.run(serve(args.libro, args.host, args.puerto, args.socket, on_ready=ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def fecha_arg(value):
+    try:
+        return parse_fecha(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida, se espera AAAA-MM-DD: '{value}'")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m gestion", description="Gestionapp sin interfaz gráfica")
+    commands = parser.add_subparsers(dest="comando", required=True)
+
+    importar = commands.add_parser("import", help="Importa extractos bancarios CSV, OFX o xlsx")
+    importar.add_argument("libro", help="Libro de destino (.xlsx o .db)")
+    importar.add_argument("archivos", nargs="+", help="Extractos a importar")
+    importar.add_argument("--encoding", help="Codificación de CSV/OFX (por defecto utf-8 y latin-1)")
+    importar.set_defaults(func=cmd_import)
+
+    reporte = commands.add_parser("report", help="Genera el reporte PDF de un rango de fechas")
+    reporte.add_argument("libro", help="Libro de origen (.xlsx o .db)")
+    reporte.add_argument("desde", type=fecha_arg, help="Fecha inicial AAAA-MM-DD")
+    reporte.add_argument("hasta", type=fecha_arg, help="Fecha final AAAA-MM-DD, inclusive")
+    reporte.add_argument("-o", "--salida", help="Archivo PDF (por defecto Reportes/Reporte_<fecha>.pdf)")
+    reporte.set_defaults(func=cmd_report)
+
+    lote = commands.add_parser("batch", help="Genera los reportes de varios libros en paralelo")
+    lote.add_argument("libros", nargs="*", help="Libros a procesar con el rango --desde/--hasta")
+    lote.add_argument("--desde", type=fecha_arg, help="Fecha inicial AAAA-MM-DD")
+    lote.add_argument("--hasta", type=fecha_arg, help="Fecha final AAAA-MM-DD, inclusive")
+    lote.add_argument("--lista", help="CSV con filas libro,desde,hasta")
+    lote.add_argument("-d", "--directorio", default="Reportes", help="Carpeta de los PDF")
+    lote.add_argument("-p", "--procesos", type=int, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    lote.add_argument("--resumen", help="CSV consolidado (por defecto <directorio>/Resumen.csv)")
+    lote.set_defaults(func=cmd_batch)
+
+    reabrir = commands.add_parser("reabrir", help="Devuelve un año archivado al libro para modificarlo")
+    reabrir.add_argument("libro", help="Libro .xlsx")
+    reabrir.add_argument("año", type=int, help="Año a reabrir, por ejemplo 2023")
+    reabrir.set_defaults(func=cmd_reopen)
+
+    servidor = commands.add_parser("serve", help="Comparte un libro entre varios puestos de la oficina")
+    servidor.add_argument("libro", help="Libro compartido (.xlsx o .db)")
+    servidor.add_argument("--host", default="127.0.0.1", help="Dirección de escucha (por defecto solo este equipo)")
+    servidor.add_argument("--puerto", type=int, default=8765, help="Puerto TCP")
+    servidor.add_argument("--socket", help="Escuchar en un socket Unix en lugar de TCP")
+    servidor.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.comando == "report" and args.desde > args.hasta:
+        parser.error("La fecha de inicio debe ser anterior a la fecha final")
+    if args.comando == "batch" and args.libros and (args.desde is None or args.hasta is None):
+        parser.error("Indique --desde y --hasta para los libros")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
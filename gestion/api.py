@@ -0,0 +1,35 @@
+import os
+from datetime import datetime, timedelta
+from gestion.storage import open_store
+
+# API sin interfaz gráfica: ningún módulo usado aquí importa tkinter. El PDF
+# se importa recién cuando se pide, así importar gestion es barato
+REPORTS_DIR = "Reportes"
+
+
+def load_book(filename, read_only=False):
+    # read_only para leer sin cerrar años ni reescribir el libro, que puede
+    # estar abierto en la aplicación
+    store = open_store(filename, read_only)
+    store.load()
+    return store
+
+
+def default_report_path(directory=REPORTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"Reporte_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf")
+
+
+def transactions_between(store, start, end, tipo=None):
+    # start y end inclusive, como en la ventana de reportes
+    return store.iter_range(start, end + timedelta(days=1), tipo)
+
+
+def write_book_report(store, path, start, end):
+    # Escribe el PDF del rango [start, end] y devuelve sus Totals
+    from gestion.report import write_report
+    return write_report(
+        path, start, end,
+        transactions_between(store, start, end, "Ingreso"),
+        transactions_between(store, start, end, "Gasto")
+    )
@@ -0,0 +1,108 @@
+import csv
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from gestion.api import load_book, write_book_report
+from gestion.model import make_totals, monto_decimal
+
+# Un libro y su rango [desde, hasta]; salida es la ruta del PDF
+BookJob = namedtuple("BookJob", "libro desde hasta salida")
+# totales es None si el rango no tiene transacciones o hubo un error
+BookResult = namedtuple("BookResult", "job totales cantidad segundos error")
+
+SUMMARY_COLUMNS = ("Libro", "Desde", "Hasta", "Transacciones", "Ingresos", "Gastos",
+                   "Ganancia", "Margen", "Reporte", "Error")
+
+
+def job_for(libro, desde, hasta, directory):
+    name = os.path.splitext(os.path.basename(libro))[0]
+    salida = os.path.join(directory, f"Reporte_{name}_{desde:%Y%m%d}_{hasta:%Y%m%d}.pdf")
+    return BookJob(libro, desde, hasta, salida)
+
+
+def run_book(jobs):
+    # Corre en un proceso del pool: carga un libro una sola vez y dibuja el
+    # PDF de cada rango pedido para él. Los errores se devuelven en el
+    # resultado para no cortar el lote; el tiempo de carga va en el primero
+    results = []
+    start = time.perf_counter()
+    try:
+        # Abrir un libro inexistente crearía uno vacío
+        if not os.path.exists(jobs[0].libro):
+            raise FileNotFoundError(f"No existe el libro {jobs[0].libro}")
+        store = load_book(jobs[0].libro, read_only=True)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return [BookResult(job, None, 0, time.perf_counter() - start, error) for job in jobs]
+
+    try:
+        for job in jobs:
+            try:
+                cantidad = store.count(job.desde, job.hasta + timedelta(days=1))
+                totales = write_book_report(store, job.salida, job.desde, job.hasta) if cantidad else None
+            except Exception as e:
+                results.append(BookResult(job, None, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}"))
+            else:
+                results.append(BookResult(job, totales, cantidad, time.perf_counter() - start, None))
+            start = time.perf_counter()
+    finally:
+        store.close()
+    return results
+
+
+def run_batch(jobs, workers=None, on_result=None):
+    # Reparte los libros entre procesos (por defecto uno por núcleo). Los
+    # rangos de un mismo libro van juntos al mismo proceso: se carga una
+    # vez y nunca dos procesos leen el mismo libro a la vez.
+    # on_result(resultado) se llama a medida que terminan; la lista devuelta
+    # respeta el orden de jobs
+    jobs = list(jobs)
+    by_book = {}
+    for i, job in enumerate(jobs):
+        by_book.setdefault(os.path.abspath(job.libro), []).append(i)
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_book, [jobs[i] for i in indexes]): indexes
+            for indexes in by_book.values()
+        }
+        for future in as_completed(futures):
+            for i, result in zip(futures[future], future.result()):
+                results[i] = result
+                if on_result is not None:
+                    on_result(result)
+    return results
+
+
+def consolidate(results):
+    # Totales de todos los libros que generaron reporte
+    ingresos = sum(r.totales.ingresos for r in results if r.totales)
+    gastos = sum(r.totales.gastos for r in results if r.totales)
+    return make_totals(ingresos, gastos), sum(r.cantidad for r in results)
+
+
+def write_summary(path, results):
+    # Resumen consolidado en CSV: una fila por libro y el total general
+    def money(cents):
+        return f"{monto_decimal(cents):.2f}"
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        for r in results:
+            if r.totales:
+                numbers = [money(r.totales.ingresos), money(r.totales.gastos),
+                           money(r.totales.ganancia), f"{r.totales.margen:.1f}"]
+                reporte = r.job.salida
+            else:
+                numbers = ["", "", "", ""]
+                reporte = ""
+            writer.writerow([r.job.libro, r.job.desde.isoformat(), r.job.hasta.isoformat(),
+                             r.cantidad, *numbers, reporte, r.error or ""])
+
+        total, cantidad = consolidate(results)
+        writer.writerow(["Total", "", "", cantidad, money(total.ingresos), money(total.gastos),
+                         money(total.ganancia), f"{total.margen:.1f}", "", ""])
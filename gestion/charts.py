@@ -0,0 +1,124 @@
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from gestion.rollups import next_month
+
+# Series por período armadas con los acumulados de PeriodRollups: una
+# entrada por día, semana o mes, sin recorrer transacciones
+
+# fechas: inicio de cada período; ingresos y gastos en centavos;
+# categorias: gastos por categoría, una lista alineada con fechas
+Series = namedtuple("Series", "fechas ingresos gastos categorias")
+
+
+def auto_bucket(start, end):
+    # Período que deja entre unas decenas y unos cientos de puntos
+    days = (end - start).days
+    if days <= 92:
+        return "day"
+    if days <= 731:
+        return "week"
+    return "month"
+
+
+def bucket_bounds(start, end, bucket):
+    # (inicio, fin) de cada período que toca [start, end), recortados al rango
+    if bucket == "day":
+        current, step = start, lambda d: d + timedelta(days=1)
+    elif bucket == "week":
+        current, step = start - timedelta(days=start.weekday()), lambda d: d + timedelta(days=7)
+    elif bucket == "month":
+        current, step = start.replace(day=1), next_month
+    else:
+        raise ValueError(f"Período desconocido: {bucket}")
+
+    while current < end:
+        following = step(current)
+        yield current, max(current, start), min(following, end)
+        current = following
+
+
+def _bucket_categories(rollups, bucket, key, lo, hi, full):
+    # Los períodos completos se leen directo de su tabla; los recortados
+    # en los bordes del rango se suman con summary
+    if not full:
+        return rollups.summary(lo, hi)
+    if bucket == "day":
+        return rollups.days.get(key, {})
+    if bucket == "week":
+        return rollups.weeks.get(key.isocalendar()[:2], {})
+    return rollups.months.get((key.year, key.month), {})
+
+
+def build_series(rollups, start, end, bucket, top=5):
+    # Serie de [start, end); las categorías con más gastos van aparte y el
+    # resto se suma en "Otras"
+    fechas, ingresos, gastos, por_categoria = [], [], [], []
+    totales = {}
+    for key, lo, hi in bucket_bounds(start, end, bucket):
+        full = key == lo and (hi - lo).days == _bucket_days(key, bucket)
+        categories = _bucket_categories(rollups, bucket, key, lo, hi, full)
+        fechas.append(key)
+        ingresos.append(sum(values[0] for values in categories.values()))
+        gastos.append(sum(values[1] for values in categories.values()))
+        por_categoria.append({name: values[1] for name, values in categories.items() if values[1]})
+        for name, values in categories.items():
+            totales[name] = totales.get(name, 0) + values[1]
+
+    # Las categorías solo de ingresos (Ventas, Sueldo) no cuentan: sin
+    # gastos no aportan a "Otras"
+    con_gastos = {name: total for name, total in totales.items() if total}
+    principales = [name for name, _ in sorted(con_gastos.items(), key=lambda item: -item[1])[:top]]
+    categorias = {name: [bucket.get(name, 0) for bucket in por_categoria] for name in principales}
+    if len(con_gastos) > len(principales):
+        categorias["Otras"] = [
+            sum(value for name, value in bucket.items() if name not in categorias)
+            for bucket in por_categoria
+        ]
+    return Series(fechas, ingresos, gastos, categorias)
+
+
+def _bucket_days(key, bucket):
+    if bucket == "day":
+        return 1
+    if bucket == "week":
+        return 7
+    return (next_month(key) - key).days
+
+
+def downsample(values, width):
+    # Nivel de detalle: con más puntos que píxeles se guarda, por cada
+    # columna de píxeles, el mínimo y el máximo en su orden, así los picos
+    # siguen visibles. Devuelve pares (índice, valor)
+    n = len(values)
+    if n <= 2 * width:
+        return list(enumerate(values))
+
+    points = []
+    per_pixel = n / width
+    for column in range(width):
+        lo = int(column * per_pixel)
+        hi = max(lo + 1, int((column + 1) * per_pixel))
+        window = range(lo, min(hi, n))
+        i_min = min(window, key=values.__getitem__)
+        i_max = max(window, key=values.__getitem__)
+        for i in sorted({i_min, i_max}):
+            points.append((i, values[i]))
+    return points
+
+
+class RenderCache:
+    # Caché LRU de resultados ya calculados (series o coordenadas de dibujo)
+    # por clave; la clave incluye la versión de los acumulados, así un
+    # cambio en los datos no devuelve dibujos viejos
+    def __init__(self, size=32):
+        self.size = size
+        self.items = OrderedDict()
+
+    def get(self, key, compute):
+        if key in self.items:
+            self.items.move_to_end(key)
+            return self.items[key]
+        value = self.items[key] = compute()
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+        return value
@@ -0,0 +1,282 @@
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import namedtuple
+from datetime import datetime
+from gestion.model import Transaction, parse_fecha, parse_monto
+
+# Categoría de los movimientos que no traen una
+SIN_CATEGORIA = "Sin categoría"
+
+# Formatos de fecha habituales en extractos bancarios
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%y", "%Y%m%d")
+
+# Encabezados aceptados (en minúsculas y sin acentos) para cada campo.
+# "Cargo" y "Abono" son las columnas separadas de débitos y créditos
+HEADER_ALIASES = {
+    "Fecha": ("fecha", "date", "fecha operacion", "fecha valor", "fecha de operacion"),
+    "Tipo": ("tipo", "type"),
+    "Categoría": ("categoria", "category"),
+    "Monto": ("monto", "importe", "amount", "valor"),
+    "Descripción": ("descripcion", "description", "concepto", "detalle", "memo"),
+    "Cargo": ("cargo", "debito", "debe", "debit"),
+    "Abono": ("abono", "credito", "haber", "credit"),
+    "ID": ("id",)
+}
+
+TIPO_ALIASES = {
+    "ingreso": "Ingreso", "credito": "Ingreso", "credit": "Ingreso", "abono": "Ingreso",
+    "gasto": "Gasto", "debito": "Gasto", "debit": "Gasto", "cargo": "Gasto"
+}
+
+ImportResult = namedtuple("ImportResult", "agregadas duplicadas errores segundos")
+
+
+def _plain(text):
+    # Minúsculas, sin acentos ni espacios de más
+    text = unicodedata.normalize("NFKD", str(text).strip().lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _map_header(header):
+    # Índice de columna de cada campo conocido; las demás columnas se ignoran
+    lookup = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+    mapping = {}
+    for i, name in enumerate(header):
+        field = lookup.get(_plain(name)) if name is not None else None
+        if field is not None and field not in mapping:
+            mapping[field] = i
+
+    if "Fecha" not in mapping:
+        raise ValueError("El archivo no tiene columna de fecha")
+    if "Monto" not in mapping and "Cargo" not in mapping and "Abono" not in mapping:
+        raise ValueError("El archivo no tiene columna de monto")
+    return mapping
+
+
+# Montos con un solo tipo de separador usado para los miles
+_THOUSANDS = {
+    ",": re.compile(r"[-+]?[1-9]\d{0,2}(,\d{3})+$"),
+    ".": re.compile(r"[-+]?[1-9]\d{0,2}(\.\d{3})+$")
+}
+# Monto ya normalizado: punto decimal y a lo sumo dos decimales
+_AMOUNT = re.compile(r"[-+]?(\d+(\.\d{0,2})?|\.\d{1,2})$")
+
+
+def normalize_fecha(value):
+    if not isinstance(value, str):
+        return parse_fecha(value)
+    text = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Fecha inválida: '{value}'")
+
+
+def normalize_monto(value):
+    # Monto en centavos con signo; acepta "$1.234,56", "1,234.56", "(12.50)".
+    # Un monto con más de dos decimales se rechaza en vez de redondearlo
+    if isinstance(value, float):
+        # Celdas numéricas: no hay separadores; se tolera el ruido binario
+        # (0.1 + 0.2) pero no un tercer decimal de verdad
+        if abs(value * 100 - round(value * 100)) > 1e-6:
+            raise ValueError(f"Monto inválido: '{value}'")
+        return parse_monto(round(value, 2))
+    if not isinstance(value, str):
+        return parse_monto(value)
+
+    text = value.strip().replace("$", "").replace(" ", "")
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1]
+
+    # Con los dos separadores, el último es el decimal. Con uno solo, sea
+    # coma o punto, es de miles si separa grupos de tres dígitos
+    # ("1.500", "1,234,567") y decimal en otro caso ("1,5", "12.50")
+    if "," in text and "." in text:
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    else:
+        for separator in ",.":
+            if separator in text:
+                if _THOUSANDS[separator].match(text):
+                    text = text.replace(separator, "")
+                else:
+                    text = text.replace(separator, ".")
+
+    if not _AMOUNT.match(text):
+        raise ValueError(f"Monto inválido: '{value}'")
+    cents = parse_monto(text)
+    return -cents if negative else cents
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def row_to_transaction(row):
+    # row: dict con los campos de HEADER_ALIASES presentes en el archivo.
+    # El tipo sale de la columna Tipo, de Cargo/Abono o del signo del monto
+    fecha = normalize_fecha(row["Fecha"])
+
+    if not _is_blank(row.get("Monto")):
+        monto = normalize_monto(row["Monto"])
+    elif not _is_blank(row.get("Cargo")):
+        monto = -abs(normalize_monto(row["Cargo"]))
+    elif not _is_blank(row.get("Abono")):
+        monto = abs(normalize_monto(row["Abono"]))
+    else:
+        raise ValueError("Fila sin monto")
+
+    tipo = row.get("Tipo")
+    if _is_blank(tipo):
+        tipo = "Gasto" if monto < 0 else "Ingreso"
+    else:
+        tipo = TIPO_ALIASES.get(_plain(tipo))
+        if tipo is None:
+            raise ValueError(f"Tipo inválido: '{row['Tipo']}'")
+
+    categoria = row.get("Categoría")
+    categoria = SIN_CATEGORIA if _is_blank(categoria) else str(categoria).strip()
+    descripcion = row.get("Descripción")
+    descripcion = "" if _is_blank(descripcion) else str(descripcion).strip()
+    transaction_id = row.get("ID")
+    transaction_id = None if _is_blank(transaction_id) else str(transaction_id).strip()
+
+    return Transaction(fecha, sys.intern(tipo), sys.intern(categoria), abs(monto),
+                       descripcion, transaction_id)
+
+
+def _table_rows(header, rows, first_line):
+    # Convierte filas de una tabla con encabezado en (línea, dict de campos)
+    mapping = _map_header(header)
+    for line, row in enumerate(rows, first_line):
+        if all(_is_blank(value) for value in row):
+            continue
+        yield line, {field: row[i] if i < len(row) else None for field, i in mapping.items()}
+
+
+def read_csv(path, encoding="utf-8-sig"):
+    with open(path, newline="", encoding=encoding) as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield from _table_rows(header, reader, 2)
+
+
+def read_xlsx_statement(path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield from _table_rows(header, rows, 2)
+    finally:
+        workbook.close()
+
+
+def _ofx_tags(f, chunk_size=65536):
+    # Recorre el OFX (SGML o XML) por bloques y devuelve (etiqueta, valor);
+    # las etiquetas de cierre llegan como "/ETIQUETA" con valor vacío
+    pending = ""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        parts = (pending + chunk).split("<")
+        pending = parts.pop()
+        for part in parts:
+            tag, _, value = part.partition(">")
+            if tag:
+                yield tag.strip().upper(), value.strip()
+    tag, _, value = pending.partition(">")
+    if tag:
+        yield tag.strip().upper(), value.strip()
+
+
+def read_ofx(path, encoding="latin-1"):
+    # Cada <STMTTRN> es un movimiento; FITID identifica el movimiento en el
+    # banco y se usa como ID para que reimportar el extracto no duplique
+    with open(path, encoding=encoding) as f:
+        current = None
+        number = 0
+        for tag, value in _ofx_tags(f):
+            if tag == "STMTTRN":
+                current = {}
+                number += 1
+            elif tag == "/STMTTRN" and current is not None:
+                descripcion = " - ".join(v for v in (current.get("NAME"), current.get("MEMO")) if v)
+                yield number, {
+                    "Fecha": current.get("DTPOSTED", "")[:8],
+                    "Monto": current.get("TRNAMT"),
+                    "Descripción": descripcion,
+                    "ID": f"ofx-{current['FITID']}" if current.get("FITID") else None
+                }
+                current = None
+            elif current is not None and value:
+                current[tag] = value
+
+
+def read_statement(path, encoding=None):
+    # Devuelve un iterador de (línea o número de movimiento, dict de campos)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_csv(path, encoding or "utf-8-sig")
+    if extension in (".ofx", ".qfx"):
+        return read_ofx(path, encoding or "latin-1")
+    if extension in (".xlsx", ".xlsm"):
+        return read_xlsx_statement(path)
+    raise ValueError(f"Formato no soportado: {extension}")
+
+
+def import_statement(path, store, encoding=None):
+    # Lee, valida y agrega todo el extracto en un solo lote. Las filas con
+    # errores se informan como (línea, mensaje) y no se agregan; los IDs ya
+    # presentes en el libro se cuentan como duplicados
+    start = time.perf_counter()
+    transactions = []
+    errors = []
+    seen = set()
+    duplicates = 0
+
+    for line, row in read_statement(path, encoding):
+        try:
+            transaction = row_to_transaction(row)
+        except (ValueError, TypeError) as e:
+            errors.append((line, str(e)))
+            continue
+        if store.is_closed(transaction.fecha):
+            errors.append((line, f"El año {transaction.fecha.year} está cerrado"))
+            continue
+
+        if transaction.id is not None:
+            if transaction.id in seen or store.get(transaction.id) is not None:
+                duplicates += 1
+                continue
+            seen.add(transaction.id)
+        transactions.append(transaction)
+
+    store.add_many(transactions)
+    return ImportResult(transactions, duplicates, errors, time.perf_counter() - start)
+
+
+def rows_per_second(result):
+    total = len(result.agregadas) + result.duplicadas + len(result.errores)
+    return total / result.segundos if result.segundos > 0 else 0.0
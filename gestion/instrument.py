@@ -0,0 +1,155 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Límites superiores de los tramos del histograma de latencias, en ms
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Stat:
+    __slots__ = ("count", "total", "max", "rows", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds, rows):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if rows is not None:
+            self.rows += rows
+        self.histogram[bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+
+    def to_dict(self):
+        labels = [f"<={limit}ms" for limit in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "llamadas": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "promedio_ms": round(self.total * 1000 / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max * 1000, 3),
+            "filas": self.rows,
+            "histograma": {label: n for label, n in zip(labels, self.histogram) if n}
+        }
+
+
+class Instrumentation:
+    # Mediciones opcionales: cantidad de llamadas, histograma de latencias y
+    # filas por operación, más una traza de eventos en formato Chrome
+    # (chrome://tracing, Perfetto). Apagada cuesta una comparación por llamada
+    def __init__(self, enabled=False, max_events=100_000):
+        self.enabled = enabled
+        self.stats = {}
+        self.events = deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._profile = None
+        self._tk_call = None
+
+    @contextmanager
+    def span(self, name, **args):
+        # El bloque puede completar args, por ejemplo args["filas"] = n
+        if not self.enabled:
+            yield args
+            return
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.record(name, start, time.perf_counter() - start, args)
+
+    def record(self, name, start, seconds, args=None):
+        args = args or {}
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.add(seconds, args.get("filas"))
+            self.events.append({
+                "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                "ts": round((start - self._origin) * 1e6), "dur": round(seconds * 1e6),
+                "args": args
+            })
+
+    def summary(self):
+        with self._lock:
+            return {name: stat.to_dict() for name, stat in sorted(self.stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.events.clear()
+
+    def dump_trace(self, path):
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "resumen": self.summary()}, f, ensure_ascii=False)
+
+    # cProfile mide solo el hilo que lo inicia (el de Tk en la aplicación)
+    def start_profile(self):
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop_profile(self, path):
+        # Guarda un archivo pstats: python -m pstats <archivo>
+        if self._profile is None:
+            return False
+        self._profile.disable()
+        self._profile.dump_stats(path)
+        self._profile = None
+        return True
+
+    @property
+    def profiling(self):
+        return self._profile is not None
+
+    def install_tk_hook(self):
+        # Mide cada callback de Tk (eventos, comandos y root.after)
+        # reemplazando tkinter.CallWrapper.__call__. Tk guarda el método ya
+        # ligado al registrar cada comando, así que el reemplazo alcanza solo
+        # a los registrados después: hay que instalarlo antes de crear los
+        # widgets, y el menú de la aplicación solo cambia enabled
+        import tkinter
+        if self._tk_call is not None:
+            return
+        original = self._tk_call = tkinter.CallWrapper.__call__
+        instrumentation = self
+
+        def __call__(wrapper, *args):
+            if not instrumentation.enabled:
+                return original(wrapper, *args)
+            start = time.perf_counter()
+            try:
+                return original(wrapper, *args)
+            finally:
+                instrumentation.record(_callback_name(wrapper.func), start, time.perf_counter() - start)
+
+        tkinter.CallWrapper.__call__ = __call__
+
+    def remove_tk_hook(self):
+        import tkinter
+        if self._tk_call is not None:
+            tkinter.CallWrapper.__call__ = self._tk_call
+            self._tk_call = None
+
+
+def _callback_name(func):
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    # root.after envuelve la función en un callit interno
+    if name.endswith("after.<locals>.callit"):
+        return "tk:after"
+    return f"tk:{name}"
+
+
+# Instancia compartida; GESTIONAPP_PERFIL=1 la enciende desde el arranque
+instrumentation = Instrumentation(enabled=os.environ.get("GESTIONAPP_PERFIL") == "1")
@@ -0,0 +1,86 @@
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Resumen de un rango: ingresos, gastos y ganancia en centavos, margen en %
+Totals = namedtuple("Totals", "ingresos gastos ganancia margen")
+
+
+def parse_fecha(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+
+
+def parse_monto(value):
+    # Monto en centavos enteros; los float se leen por su repr para no
+    # arrastrar errores de redondeo binario (0.1 -> 10 centavos)
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Monto inválido: '{value}'")
+    if not amount.is_finite():
+        raise ValueError(f"Monto inválido: '{value}'")
+    return int(amount.scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+
+def monto_decimal(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def format_monto(cents):
+    return f"${monto_decimal(cents):.2f}"
+
+
+def parse_texto(value):
+    # Excel guarda como número lo que parece número ("1234"); vacío es ""
+    return "" if value is None else str(value)
+
+
+def make_totals(ingresos, gastos):
+    ganancia = ingresos - gastos
+    margen = (ganancia / ingresos * 100) if ingresos != 0 else 0
+    return Totals(ingresos, gastos, ganancia, margen)
+
+
+class Transaction:
+    # Registro compacto: la fecha se guarda como date y el monto en centavos
+    __slots__ = ("id", "fecha", "tipo", "categoria", "monto", "descripcion")
+
+    def __init__(self, fecha, tipo, categoria, monto, descripcion="", id=None):
+        self.id = id
+        self.fecha = fecha
+        self.tipo = tipo
+        self.categoria = categoria
+        self.monto = monto
+        self.descripcion = descripcion
+
+    @classmethod
+    def from_row(cls, row):
+        # Convierte una fila del libro (claves "Fecha", "Monto", ...) una sola vez
+        return cls(
+            parse_fecha(row["Fecha"]),
+            parse_texto(row["Tipo"]),
+            parse_texto(row["Categoría"]),
+            parse_monto(row["Monto"]),
+            parse_texto(row["Descripción"]),
+            row.get("ID")
+        )
+
+    def to_row(self):
+        return {
+            "Fecha": self.fecha.isoformat(),
+            "Tipo": self.tipo,
+            "Categoría": self.categoria,
+            "Monto": float(monto_decimal(self.monto)),
+            "Descripción": self.descripcion,
+            "ID": self.id
+        }
+
+    def __repr__(self):
+        return (f"Transaction({self.fecha.isoformat()}, {self.tipo}, {self.categoria}, "
+                f"{format_monto(self.monto)}, id={self.id})")
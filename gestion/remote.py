@@ -0,0 +1,241 @@
+import itertools
+import json
+import queue
+import socket
+import threading
+from datetime import date
+from gestion.model import Transaction
+from gestion.rollups import PeriodRollups
+from gestion.server import encode
+from gestion.storage import DateIndex, date_key, new_id
+
+# Espera máxima de una respuesta del servidor, en segundos
+TIMEOUT = 60
+
+
+def connect(address):
+    # "unix:///ruta/al/socket" o "tcp://host:puerto"
+    if address.startswith("unix://"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address[len("unix://"):])
+        return sock
+    host, port = address[len("tcp://"):].rsplit(":", 1)
+    return socket.create_connection((host, int(port)))
+
+
+class RemoteStore:
+    # Libro de un servidor (python -m gestion serve) con la misma interfaz
+    # que XlsxStore. Guarda una copia de las transacciones para leer sin ir
+    # al servidor; los cambios se mandan al servidor, que los acepta solo si
+    # la fila no cambió desde otro puesto. Los cambios de los demás puestos
+    # llegan como avisos y se aplican a la copia en take_changes
+    def __init__(self, address):
+        self.address = address
+        self.transactions = {}
+        self.index = DateIndex()
+        self.archived = []
+        self.archived_states = []
+        self.loaded_years = set()
+        self.closed_through = None
+        self._newly_loaded = []
+        self._changes = queue.SimpleQueue()
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._socket = None
+        self._send_lock = threading.Lock()
+        # Protege la copia local: la usan el hilo de Tk y el de fondo
+        self._lock = threading.RLock()
+
+    def load(self):
+        self._socket = connect(self.address)
+        threading.Thread(target=self._read_loop, args=(self._socket.makefile("rb"),), daemon=True).start()
+
+        state = self._request("abrir")
+        transactions = {}
+        for row in state["filas"]:
+            t = Transaction.from_row(row)
+            transactions[t.id] = t
+        with self._lock:
+            self.transactions = transactions
+            self.index = DateIndex(transactions.values())
+            self.archived = state["archivados"]
+            self.archived_states = state["acumulados"]
+            self.closed_through = state["cerrado_hasta"]
+            self.loaded_years = set()
+            self._newly_loaded = []
+
+    def _read_loop(self, reader):
+        # Hilo lector: entrega cada respuesta a quien la espera y encola los
+        # avisos de cambios en el orden en que llegan
+        try:
+            for line in reader:
+                message = json.loads(line)
+                if "evento" in message:
+                    self._changes.put(message)
+                    continue
+                slot = self._pending.pop(message["pedido"])
+                slot[1] = message
+                slot[0].set()
+        except (OSError, ValueError):
+            pass
+        self._changes.put({"evento": "desconectado"})
+        for event, _ in list(self._pending.values()):
+            event.set()
+
+    def _request(self, op, **data):
+        request_id = next(self._ids)
+        slot = self._pending[request_id] = [threading.Event(), None]
+        try:
+            with self._send_lock:
+                if self._socket is None:
+                    raise ConnectionError("No hay conexión con el servidor")
+                self._socket.sendall(encode({"pedido": request_id, "op": op, **data}))
+        except OSError:
+            self._pending.pop(request_id, None)
+            raise
+        if not slot[0].wait(TIMEOUT) or slot[1] is None:
+            self._pending.pop(request_id, None)
+            raise ConnectionError("Se perdió la conexión con el servidor")
+
+        reply = slot[1]
+        if "error" in reply:
+            error = KeyError if reply["error"] == "KeyError" else ValueError
+            raise error(reply["mensaje"])
+        return reply["resultado"]
+
+    def take_changes(self):
+        # Aplica a la copia los cambios hechos desde otros puestos y los
+        # devuelve como pares (anterior, nueva), igual que refresh_row
+        changes = []
+        while True:
+            try:
+                event = self._changes.get_nowait()
+            except queue.Empty:
+                return changes
+
+            with self._lock:
+                if event["evento"] == "agregar":
+                    rows = [Transaction.from_row(row) for row in event["filas"]]
+                    for t in rows:
+                        self.transactions[t.id] = t
+                        changes.append((None, t))
+                    self.index.extend(rows)
+                elif event["evento"] == "modificar":
+                    new = Transaction.from_row(event["fila"])
+                    old = self.transactions[new.id]
+                    self.transactions[new.id] = new
+                    self.index.replace(old, new)
+                    changes.append((old, new))
+                elif event["evento"] == "eliminar":
+                    old = self.transactions.pop(event["id"])
+                    self.index.remove(old)
+                    changes.append((old, None))
+                else:
+                    raise ConnectionError("Se perdió la conexión con el servidor")
+
+    def years_needed(self, start, end):
+        start, end = date_key(start), date_key(end)
+        return [
+            year for year in self.archived
+            if year not in self.loaded_years and date(year, 1, 1) < end and date(year, 12, 31) >= start
+        ]
+
+    def needs_load(self, start, end):
+        return bool(self.years_needed(start, end))
+
+    def ensure_loaded(self, start, end):
+        for year in self.years_needed(start, end):
+            rows = [Transaction.from_row(row) for row in self._request("archivo", año=year)]
+            with self._lock:
+                if year in self.loaded_years:
+                    continue
+                for t in rows:
+                    self.transactions[t.id] = t
+                self.index.extend(rows)
+                self.loaded_years.add(year)
+                self._newly_loaded.append(rows)
+
+    def take_loaded(self):
+        with self._lock:
+            loaded, self._newly_loaded = self._newly_loaded, []
+        return loaded
+
+    def resident_transactions(self):
+        with self._lock:
+            return [t for t in self.transactions.values() if t.fecha.year not in self.archived]
+
+    def archived_rollups(self):
+        return [PeriodRollups.from_state(state) for state in self.archived_states]
+
+    def is_closed(self, fecha):
+        if self.closed_through is not None and fecha.year <= self.closed_through:
+            return True
+        return fecha.year in self.archived
+
+    def get(self, transaction_id):
+        return self.transactions.get(transaction_id)
+
+    def add(self, transaction):
+        self.add_many([transaction])
+        return transaction.id
+
+    def add_many(self, transactions):
+        transactions = list(transactions)
+        for t in transactions:
+            if t.id is None:
+                t.id = new_id()
+        self._request("agregar", filas=[t.to_row() for t in transactions])
+        with self._lock:
+            for t in transactions:
+                self.transactions[t.id] = t
+            self.index.extend(transactions)
+
+    def update(self, transaction_id, transaction):
+        old = self.transactions[transaction_id]
+        transaction.id = transaction_id
+        self._request("modificar", id=transaction_id, anterior=old.to_row(), fila=transaction.to_row())
+        with self._lock:
+            self.transactions[transaction_id] = transaction
+            self.index.replace(old, transaction)
+
+    def remove(self, transaction_id):
+        old = self.transactions[transaction_id]
+        self._request("eliminar", id=transaction_id, anterior=old.to_row())
+        with self._lock:
+            del self.transactions[transaction_id]
+            self.index.remove(old)
+
+    def range(self, start, end):
+        self.ensure_loaded(start, end)
+        with self._lock:
+            return self.index.range(date_key(start), date_key(end))
+
+    def iter_range(self, start, end, tipo=None):
+        for t in self.range(start, end):
+            if tipo is None or t.tipo == tipo:
+                yield t
+
+    def count(self, start, end):
+        self.ensure_loaded(start, end)
+        with self._lock:
+            return self.index.count(date_key(start), date_key(end))
+
+    # El servidor decide cuándo reescribir el libro
+    def has_pending_changes(self):
+        return False
+
+    def needs_compaction(self):
+        return False
+
+    def compact(self):
+        self._request("guardar")
+
+    def close(self):
+        if self._socket is not None:
+            # shutdown despierta al hilo lector
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
@@ -0,0 +1,266 @@
+import tempfile
+import zlib
+from functools import lru_cache
+from itertools import chain
+from fpdf import FPDF
+from fpdf.php import sprintf
+from gestion.model import format_monto, make_totals, monto_decimal
+
+COLUMNAS = ['Fecha', 'Categoría', 'Descripción', 'Monto']
+ANCHOS = [25, 35, 80, 25]
+ALTO_LINEA = 8
+
+
+class _FileBuffer:
+    # Reemplaza el buffer str de FPDF: escribe directo al archivo y len()
+    # devuelve los bytes escritos, que FPDF usa para armar la tabla xref
+    def __init__(self, file):
+        self.file = file
+        self.size = 0
+
+    def __iadd__(self, text):
+        data = text.encode('latin1')
+        self.file.write(data)
+        self.size += len(data)
+        return self
+
+    def __len__(self):
+        return self.size
+
+
+class StreamingPDF(FPDF):
+    # FPDF que vuelca cada página terminada a un archivo temporal y escribe
+    # el documento final directo a disco, así la memoria no crece con la
+    # cantidad de páginas. No soporta alias_nb_pages ni enlaces.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._spool = tempfile.TemporaryFile()
+        self._page_spans = {}
+
+    def _endpage(self):
+        super()._endpage()
+        data = self.pages[self.page].encode('latin1')
+        if self.compress:
+            data = zlib.compress(data)
+        self._page_spans[self.page] = (self._spool.tell(), len(data))
+        self._spool.write(data)
+        self.pages[self.page] = ''
+
+    def _putpages(self):
+        if self.def_orientation == 'P':
+            w_pt, h_pt = self.fw_pt, self.fh_pt
+        else:
+            w_pt, h_pt = self.fh_pt, self.fw_pt
+        filter = '/Filter /FlateDecode ' if self.compress else ''
+
+        for n in range(1, self.page + 1):
+            self._newobj()
+            self._out('<</Type /Page')
+            self._out('/Parent 1 0 R')
+            if n in self.orientation_changes:
+                self._out(sprintf('/MediaBox [0 0 %.2f %.2f]', h_pt, w_pt))
+            self._out('/Resources 2 0 R')
+            if self.pdf_version > '1.3':
+                self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+            self._out('/Contents ' + str(self.n + 1) + ' 0 R>>')
+            self._out('endobj')
+
+            # Contenido de la página, leído del temporal
+            offset, length = self._page_spans[n]
+            self._spool.seek(offset)
+            content = self._spool.read(length)
+            self._newobj()
+            self._out('<<' + filter + '/Length ' + str(len(content)) + '>>')
+            self._putstream(content)
+            self._out('endobj')
+
+        self.offsets[1] = len(self.buffer)
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(str(3 + 2 * i) + ' 0 R ' for i in range(self.page)) + ']')
+        self._out('/Count ' + str(self.page))
+        self._out(sprintf('/MediaBox [0 0 %.2f %.2f]', w_pt, h_pt))
+        self._out('>>')
+        self._out('endobj')
+
+    def output(self, name='', dest=''):
+        with open(name, 'wb') as f:
+            self.buffer = _FileBuffer(f)
+            self.close()
+        self._spool.close()
+        return ''
+
+
+class ReportWriter:
+    # Arma el reporte consumiendo las transacciones como iterables en orden
+    # de fecha: ninguna lista de filas se guarda en memoria. Las líneas en
+    # que se parte cada descripción se cachean, igual que los anchos de letra
+    CACHE_SIZE = 4096
+
+    def __init__(self, path):
+        self.path = path
+        self.pdf = StreamingPDF(orientation='P', unit='mm', format='A4')
+        self.pdf.set_auto_page_break(auto=True, margin=15)
+        self._wrap = lru_cache(maxsize=self.CACHE_SIZE)(self._wrap_text)
+        self._char_widths = None
+
+    def write(self, start, end, ingresos, gastos):
+        pdf = self.pdf
+        pdf.add_page()
+
+        # Estilos
+        pdf.set_draw_color(34, 119, 255)
+        pdf.set_line_width(0.3)
+
+        # Encabezado
+        pdf.set_font('Arial', 'B', 16)
+        pdf.cell(0, 10, 'Reporte Financiero', 0, 1, 'C')
+        pdf.set_font('Arial', '', 12)
+        pdf.cell(0, 8, f'Periodo: {start.strftime("%d/%m/%Y")} - {end.strftime("%d/%m/%Y")}', 0, 1, 'C')
+        pdf.ln(10)
+
+        # Tablas de Ingresos y Gastos; los totales se suman al recorrerlas
+        total_ingresos = self._section('Ingresos', ingresos, "Ingresos Totales:", 8)
+        total_gastos = self._section('Gastos', gastos, "Gastos Totales:", 10)
+        resumen = make_totals(total_ingresos, total_gastos)
+
+        # Resumen financiero
+        pdf.ln(10)
+        pdf.set_font('Arial', 'B', 12)
+        pdf.set_fill_color(245, 245, 245)  # Gris claro
+        pdf.cell(0, 10, 'Resumen General', 0, 1, 'L')
+
+        pdf.set_font('Times', 'B', 11)
+        pdf.cell(60, 8, 'Concepto', 1, 0, 'C', True)
+        pdf.cell(60, 8, 'Monto', 1, 1, 'C', True)
+
+        pdf.set_font('Times', '', 11)
+        data = [
+            ('Ingresos Totales', f"${monto_decimal(resumen.ingresos):,.2f}"),
+            ('Gastos Totales', f"${monto_decimal(resumen.gastos):,.2f}"),
+            ('Ganancia Neta', f"${monto_decimal(resumen.ganancia):,.2f}"),
+            ('Margen de Ganancia', f"{resumen.margen:.1f}%")
+        ]
+
+        for label, value in data:
+            pdf.cell(60, 8, label, 1, 0, 'L')
+            pdf.cell(60, 8, value, 1, 1, 'R')
+
+        # Pie de página
+        pdf.set_y(-20)
+        pdf.set_font('Arial', 'I', 8)
+        pdf.cell(0, 5, 'Este reporte fue generado automáticamente por gestionapp', 0, 0, 'C')
+
+        pdf.output(self.path)
+        return resumen
+
+    def _section(self, titulo, rows, texto_total, espacio):
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+
+        self.pdf.set_font('Arial', 'B', 12)
+        self.pdf.cell(0, 8, titulo, 0, 1)
+        total = self.generar_tabla_con_total(chain([first], rows), texto_total)
+        self.pdf.ln(espacio)
+        return total
+
+    def generar_tabla_con_total(self, datos, texto_total):
+        pdf = self.pdf
+        self._encabezado_tabla()
+
+        # Filas
+        total = 0
+        fill = False
+
+        for item in datos:
+            total += item.monto
+
+            # Formatear descripción multilínea
+            lines = self._wrap(item.descripcion.replace('\n', ' '))
+            alto = ALTO_LINEA * len(lines)
+
+            # La fila entera va en la misma página, con el encabezado repetido
+            if pdf.get_y() + alto > pdf.page_break_trigger:
+                pdf.add_page()
+                self._encabezado_tabla()
+
+            pdf.cell(ANCHOS[0], alto, item.fecha.isoformat(), 1, 0, 'C', fill)
+            pdf.cell(ANCHOS[1], alto, item.categoria, 1, 0, 'C', fill)
+
+            # Celda de descripción: marco del alto de la fila y una línea por renglón
+            x = pdf.get_x()
+            y = pdf.get_y()
+            pdf.cell(ANCHOS[2], alto, '', 1, 0, 'L', fill)
+            for i, line in enumerate(lines):
+                pdf.set_xy(x, y + i * ALTO_LINEA)
+                pdf.cell(ANCHOS[2], ALTO_LINEA, line, 0, 0, 'L')
+            pdf.set_xy(x + ANCHOS[2], y)
+
+            pdf.cell(ANCHOS[3], alto, format_monto(item.monto), 1, 0, 'R', fill)
+            pdf.ln(alto)
+            fill = not fill
+
+        # Fila de total
+        pdf.set_font('Times', 'B', 10)
+        pdf.set_fill_color(220, 230, 255)
+        pdf.cell(sum(ANCHOS[:-1]), 8, texto_total, 1, 0, 'R', True)
+        pdf.cell(ANCHOS[3], 8, format_monto(total), 1, 1, 'R', True)
+        return total
+
+    def _encabezado_tabla(self):
+        pdf = self.pdf
+        pdf.set_fill_color(240, 245, 255)
+        pdf.set_font('Arial', 'B', 10)
+        for ancho, col in zip(ANCHOS, COLUMNAS):
+            pdf.cell(ancho, 8, col, 1, 0, 'C', True)
+        pdf.ln()
+        pdf.set_font('Times', '', 10)
+
+    def _text_width(self, text):
+        # Anchos de Times 10 en mm, calculados una sola vez
+        if self._char_widths is None:
+            scale = self.pdf.font_size / 1000.0
+            self._char_widths = {c: w * scale for c, w in self.pdf.current_font['cw'].items()}
+        widths = self._char_widths
+        return sum(widths.get(c, 0) for c in text)
+
+    def _wrap_text(self, text):
+        # Parte el texto en renglones que entran en la columna Descripción
+        max_width = ANCHOS[2] - 2 * self.pdf.c_margin
+        space = self._text_width(' ')
+        lines = []
+        current = ''
+        width = 0
+
+        for word in text.split(' '):
+            word_width = self._text_width(word)
+            # Palabras más largas que la columna se cortan por caracteres
+            while word_width > max_width:
+                if current:
+                    lines.append(current)
+                    current, width = '', 0
+                cut = len(word)
+                while cut > 1 and self._text_width(word[:cut]) > max_width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+                word_width = self._text_width(word)
+
+            if current and width + space + word_width > max_width:
+                lines.append(current)
+                current, width = word, word_width
+            elif current:
+                current += ' ' + word
+                width += space + word_width
+            else:
+                current, width = word, word_width
+
+        lines.append(current)
+        return tuple(lines)
+
+
+def write_report(path, start, end, ingresos, gastos):
+    # ingresos y gastos: iterables de transacciones en orden de fecha
+    return ReportWriter(path).write(start, end, ingresos, gastos)
@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+from gestion.model import make_totals
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+class PeriodRollups:
+    # Sumas precalculadas por día, semana ISO y mes. Cada período guarda,
+    # por categoría, [ingresos, gastos, cantidad] en centavos. Se mantienen
+    # al agregar, editar o borrar, así un resumen cuesta O(períodos) y no
+    # O(transacciones)
+    def __init__(self):
+        self.days = {}
+        self.weeks = {}
+        self.months = {}
+        # Cambia con cada modificación; sirve de clave para cachés derivadas
+        self.version = 0
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        rollups = cls()
+        for t in transactions:
+            rollups.add(t)
+        return rollups
+
+    def to_state(self):
+        # Forma JSON de los acumulados, para enviarlos por el servidor
+        return {
+            "days": [[day.toordinal(), categories] for day, categories in self.days.items()],
+            "weeks": [[*week, categories] for week, categories in self.weeks.items()],
+            "months": [[*month, categories] for month, categories in self.months.items()]
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        rollups = cls()
+        rollups.days = {date.fromordinal(day): categories for day, categories in state["days"]}
+        rollups.weeks = {(year, week): categories for year, week, categories in state["weeks"]}
+        rollups.months = {(year, month): categories for year, month, categories in state["months"]}
+        return rollups
+
+    def add(self, transaction):
+        self._apply(transaction, 1)
+
+    def merge(self, other):
+        # Suma otros acumulados, por ejemplo los precalculados de un año archivado
+        self.version += 1
+        for table, other_table in ((self.days, other.days), (self.weeks, other.weeks),
+                                   (self.months, other.months)):
+            for key, categories in other_table.items():
+                _merge(table.setdefault(key, {}), categories)
+
+    def remove(self, transaction):
+        self._apply(transaction, -1)
+
+    def _apply(self, t, sign):
+        self.version += 1
+        keys = (
+            (self.days, t.fecha),
+            (self.weeks, t.fecha.isocalendar()[:2]),
+            (self.months, (t.fecha.year, t.fecha.month))
+        )
+        for table, key in keys:
+            categories = table.setdefault(key, {})
+            bucket = categories.setdefault(t.categoria, [0, 0, 0])
+            if t.tipo == "Ingreso":
+                bucket[0] += sign * t.monto
+            elif t.tipo == "Gasto":
+                bucket[1] += sign * t.monto
+            bucket[2] += sign
+
+            if bucket[2] == 0:
+                del categories[t.categoria]
+                if not categories:
+                    del table[key]
+
+    def summary(self, start, end):
+        # Rango [start, end) de fechas: meses completos de la tabla mensual y
+        # los días de los bordes por semanas o días sueltos
+        result = {}
+        if not self.months:
+            return result
+
+        # Acotar a los meses con datos ("Mostrar todo" llega hasta el año 9999)
+        start = max(start, date(*min(self.months), 1))
+        end = min(end, next_month(date(*max(self.months), 1)))
+        if start >= end:
+            return result
+
+        first_full = start if start.day == 1 else next_month(start)
+        last_full = end.replace(day=1)
+
+        if first_full >= last_full:
+            self._add_days(result, start, end)
+            return result
+
+        self._add_days(result, start, first_full)
+        for (year, month), categories in self.months.items():
+            if first_full <= date(year, month, 1) < last_full:
+                _merge(result, categories)
+        self._add_days(result, last_full, end)
+        return result
+
+    def totals(self, start, end):
+        # Devuelve (Totals, cantidad de transacciones) del rango [start, end)
+        ingresos = gastos = cantidad = 0
+        for bucket in self.summary(start, end).values():
+            ingresos += bucket[0]
+            gastos += bucket[1]
+            cantidad += bucket[2]
+        return make_totals(ingresos, gastos), cantidad
+
+    def _add_days(self, result, start, end):
+        day = start
+        while day < end:
+            if day.weekday() == 0 and day + timedelta(days=7) <= end:
+                _merge(result, self.weeks.get(day.isocalendar()[:2], {}))
+                day += timedelta(days=7)
+            else:
+                _merge(result, self.days.get(day, {}))
+                day += timedelta(days=1)
+
+
+def _merge(result, categories):
+    for categoria, (ingresos, gastos, cantidad) in categories.items():
+        bucket = result.setdefault(categoria, [0, 0, 0])
+        bucket[0] += ingresos
+        bucket[1] += gastos
+        bucket[2] += cantidad
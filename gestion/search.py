@@ -0,0 +1,135 @@
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+_TOKEN = re.compile(r"\w+")
+
+
+def plain(text):
+    # Minúsculas y sin acentos, para buscar "credito" y encontrar "Crédito"
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokens(text):
+    return set(_TOKEN.findall(plain(text)))
+
+
+@lru_cache(maxsize=1024)
+def _category_tokens(categoria):
+    # Las categorías se repiten mucho
+    return frozenset(tokens(categoria))
+
+
+class SearchIndex:
+    # Índice invertido de las palabras de Descripción y Categoría (con
+    # búsqueda por prefijo sobre la lista ordenada de palabras), índices por
+    # categoría y tipo, y los montos ordenados para buscar por rango. Se arma
+    # al cargar y se mantiene con add/remove en cada alta, edición o baja
+    def __init__(self):
+        self.rows = {}
+        self.postings = {}
+        self.words = []
+        self.categories = {}
+        self.tipos = {}
+        self.amounts = []
+        self.amount_ids = []
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        index = cls()
+        index.add_many(transactions)
+        return index
+
+    def add_many(self, transactions):
+        # Alta en lote: las listas ordenadas se rearman una sola vez al final
+        for t in transactions:
+            self._add_fields(t)
+        self.words = sorted(self.postings)
+        pairs = sorted((t.monto, t.id) for t in self.rows.values())
+        self.amounts = [monto for monto, _ in pairs]
+        self.amount_ids = [transaction_id for _, transaction_id in pairs]
+
+    def _add_fields(self, t):
+        self.rows[t.id] = t
+        postings = self.postings
+        for word in tokens(t.descripcion) | _category_tokens(t.categoria):
+            ids = postings.get(word)
+            if ids is None:
+                ids = postings[word] = set()
+            ids.add(t.id)
+        self.categories.setdefault(t.categoria, set()).add(t.id)
+        self.tipos.setdefault(t.tipo, set()).add(t.id)
+
+    def add(self, t):
+        new_words = (tokens(t.descripcion) | _category_tokens(t.categoria)) - self.postings.keys()
+        self._add_fields(t)
+        for word in new_words:
+            self.words.insert(bisect_left(self.words, word), word)
+
+        position = bisect_right(self.amounts, t.monto)
+        self.amounts.insert(position, t.monto)
+        self.amount_ids.insert(position, t.id)
+
+    def remove(self, t):
+        del self.rows[t.id]
+        for word in tokens(t.descripcion) | _category_tokens(t.categoria):
+            ids = self.postings[word]
+            ids.discard(t.id)
+            if not ids:
+                del self.postings[word]
+                del self.words[bisect_left(self.words, word)]
+        _discard(self.categories, t.categoria, t.id)
+        _discard(self.tipos, t.tipo, t.id)
+
+        position = bisect_left(self.amounts, t.monto)
+        while self.amount_ids[position] != t.id:
+            position += 1
+        del self.amounts[position]
+        del self.amount_ids[position]
+
+    def category_names(self):
+        return sorted(self.categories)
+
+    def prefix_ids(self, prefix):
+        # IDs de todas las palabras que empiezan con prefix
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + "\U0010ffff")
+        result = set()
+        for word in self.words[start:end]:
+            result |= self.postings[word]
+        return result
+
+    def amount_ids_between(self, minimo=None, maximo=None):
+        start = 0 if minimo is None else bisect_left(self.amounts, minimo)
+        end = len(self.amounts) if maximo is None else bisect_right(self.amounts, maximo)
+        return set(self.amount_ids[start:end])
+
+    def search(self, text="", categoria=None, tipo=None, minimo=None, maximo=None):
+        # Devuelve los IDs que cumplen todos los filtros indicados, o None si
+        # no hay ninguno. Cada palabra del texto es un prefijo; montos en centavos
+        candidates = []
+        for word in sorted(tokens(text), key=len, reverse=True):
+            candidates.append(self.prefix_ids(word))
+        if categoria is not None:
+            candidates.append(self.categories.get(categoria, set()))
+        if tipo is not None:
+            candidates.append(self.tipos.get(tipo, set()))
+        if minimo is not None or maximo is not None:
+            candidates.append(self.amount_ids_between(minimo, maximo))
+
+        if not candidates:
+            return None
+        candidates.sort(key=len)
+        return candidates[0].intersection(*candidates[1:])
+
+
+def _discard(index, key, transaction_id):
+    ids = index[key]
+    ids.discard(transaction_id)
+    if not ids:
+        del index[key]
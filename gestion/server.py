@@ -0,0 +1,163 @@
+import asyncio
+import json
+from gestion.model import Transaction
+from gestion.storage import open_store, read_chunk_rows
+
+# Libro compartido entre varios puestos: un único proceso tiene el libro en
+# memoria y atiende a los clientes (RemoteStore) por localhost o un socket
+# Unix. Cada mensaje es una línea JSON; las respuestas llevan el número de
+# "pedido" y los avisos de cambios llevan "evento"
+DEFAULT_PORT = 8765
+# Tope de una línea: un libro entero viaja en la respuesta de "abrir"
+MAX_MESSAGE = 256 * 1024 * 1024
+
+
+def encode(message):
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class LedgerServer:
+    # Espera tras el último cambio antes de compactar el libro
+    SAVE_DELAY = 2.0
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.store = open_store(filename)
+        self.clients = set()
+        self._save_timer = None
+        self._saving = None
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT, path=None):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store.load)
+        if path:
+            return await asyncio.start_unix_server(self.handle, path=path, limit=MAX_MESSAGE)
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_MESSAGE)
+
+    async def close(self):
+        # Corta a los clientes (que pasan a "sin conexión" en vez de esperar
+        # respuestas) y guarda lo pendiente antes de salir
+        for client in list(self.clients):
+            client.close()
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+        if self._saving is not None:
+            await self._saving
+        if self.store.has_pending_changes():
+            await asyncio.get_running_loop().run_in_executor(None, self.store.compact)
+        self.store.close()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                try:
+                    reply = {"pedido": request["pedido"], "resultado": await self.dispatch(request, writer)}
+                except (KeyError, ValueError) as e:
+                    reply = {"pedido": request["pedido"], "error": type(e).__name__, "mensaje": str(e)}
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def dispatch(self, request, writer):
+        # Los cambios corren en el hilo del servidor, uno a la vez: el orden
+        # en que se aplican es el orden en que los ven todos los clientes
+        op = request["op"]
+        store = self.store
+        if op == "abrir":
+            # Desde aquí recibe los avisos: todo cambio posterior a esta copia
+            self.clients.add(writer)
+            return {
+                "filas": [t.to_row() for t in store.resident_transactions()],
+                "archivados": sorted(getattr(store, "chunks", {})),
+                "acumulados": [rollups.to_state() for rollups in store.archived_rollups()],
+                # SQLite no cierra años
+                "cerrado_hasta": getattr(store, "closed_through", None)
+            }
+
+        if op == "agregar":
+            transactions = [Transaction.from_row(row) for row in request["filas"]]
+            for t in transactions:
+                if t.id is None or store.get(t.id) is not None:
+                    raise ValueError(f"Transacción sin ID o repetida: {t.id}")
+            store.add_many(transactions)
+            self.notify(writer, {"evento": "agregar", "filas": request["filas"]})
+        elif op == "modificar":
+            self._check_current(request["id"], request["anterior"])
+            transaction = Transaction.from_row(request["fila"])
+            store.update(request["id"], transaction)
+            self.notify(writer, {"evento": "modificar", "fila": transaction.to_row()})
+        elif op == "eliminar":
+            self._check_current(request["id"], request["anterior"])
+            store.remove(request["id"])
+            self.notify(writer, {"evento": "eliminar", "id": request["id"]})
+        elif op == "archivo":
+            # Filas de un año cerrado; no cambian, así que no hace falta
+            # cargarlas en el libro del servidor
+            path = store.chunk_path(request["año"])
+            rows = await asyncio.get_running_loop().run_in_executor(None, read_chunk_rows, path)
+            return [t.to_row() for t in rows]
+        elif op == "guardar":
+            await self.save()
+            return None
+        else:
+            raise ValueError(f"Operación desconocida: {op}")
+
+        self.schedule_save()
+        return None
+
+    def _check_current(self, transaction_id, expected):
+        # El cliente manda la fila tal como la ve; si otro puesto la cambió
+        # mientras tanto se rechaza en vez de pisar ese cambio
+        current = self.store.get(transaction_id)
+        if current is None or current.to_row() != expected:
+            raise ValueError("La transacción fue modificada o eliminada desde otro puesto")
+
+    def notify(self, origin, event):
+        # Aviso a los demás clientes; quien hizo el cambio ya lo aplicó
+        message = encode(event)
+        for client in self.clients:
+            if client is not origin and not client.is_closing():
+                client.write(message)
+
+    def schedule_save(self):
+        # Persistencia en lote: cada cambio ya está en el diario; el xlsx se
+        # reescribe una vez, SAVE_DELAY después del último cambio, cuando el
+        # diario creció lo suficiente
+        if not self.store.needs_compaction():
+            return
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+        self._save_timer = asyncio.get_running_loop().call_later(
+            self.SAVE_DELAY, lambda: asyncio.ensure_future(self.save())
+        )
+
+    async def save(self):
+        self._save_timer = None
+        if self._saving is None:
+            self._saving = asyncio.ensure_future(
+                asyncio.get_running_loop().run_in_executor(None, self.store.compact)
+            )
+        try:
+            await self._saving
+        finally:
+            self._saving = None
+
+
+async def serve(filename, host="127.0.0.1", port=DEFAULT_PORT, path=None, on_ready=None):
+    ledger = LedgerServer(filename)
+    server = await ledger.start(host, port, path)
+    if on_ready is not None:
+        on_ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await ledger.close()
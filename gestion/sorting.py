@@ -0,0 +1,75 @@
+from bisect import bisect_left, bisect_right
+from gestion.search import plain
+
+# Clave de orden de cada columna; la fecha desempata para que el orden sea
+# estable entre ediciones
+SORT_KEYS = {
+    "Fecha": lambda t: t.fecha,
+    "Tipo": lambda t: (t.tipo, t.fecha),
+    "Categoría": lambda t: (plain(t.categoria), t.fecha),
+    "Monto": lambda t: (t.monto, t.fecha),
+    "Descripción": lambda t: (plain(t.descripcion), t.fecha)
+}
+
+
+class Descending:
+    # Invierte la comparación de una clave, para usar bisect en órdenes
+    # descendentes
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def sort_key(column, descending=False):
+    key = SORT_KEYS[column]
+    if descending:
+        return lambda t: Descending(key(t))
+    return key
+
+
+class SortCache:
+    # Órdenes ya calculados de las filas visibles, por (columna, descendente).
+    # Al editar se actualizan con bisect en vez de descartarse; al cambiar
+    # las filas visibles (período o búsqueda) se reinician
+    def __init__(self):
+        self.orders = {}
+
+    def reset(self, rows):
+        # rows viene ordenado por fecha ascendente
+        self.orders = {("Fecha", False): rows}
+
+    def get(self, column, descending=False):
+        order = self.orders.get((column, descending))
+        if order is None:
+            opposite = self.orders.get((column, not descending))
+            if opposite is not None:
+                # El orden inverso ya calculado se da vuelta en O(n)
+                order = opposite[::-1]
+            else:
+                # Se ordena con la clave cruda y reverse: envolver cada clave
+                # en Descending sería varias veces más lento
+                base = next(iter(self.orders.values()))
+                order = sorted(base, key=SORT_KEYS[column], reverse=descending)
+            self.orders[(column, descending)] = order
+        return order
+
+    def insert(self, row):
+        for (column, descending), order in self.orders.items():
+            key = sort_key(column, descending)
+            order.insert(bisect_right(order, key(row), key=key), row)
+
+    def remove(self, row):
+        for (column, descending), order in self.orders.items():
+            key = sort_key(column, descending)
+            value = key(row)
+            index = bisect_left(order, value, key=key)
+            while order[index].id != row.id:
+                index += 1
+            del order[index]
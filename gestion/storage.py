@@ -0,0 +1,887 @@
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from urllib.request import pathname2url
+from gestion.model import Transaction
+
+COLUMNS = ("Fecha", "Tipo", "Categoría", "Monto", "Descripción", "ID")
+SQL_COLUMNS = ("fecha", "tipo", "categoria", "monto", "descripcion", "id")
+
+# Subir al cambiar el formato de las filas guardadas en la instantánea
+SNAPSHOT_VERSION = 1
+# Subir al cambiar el formato de los archivos de años cerrados
+CHUNK_VERSION = 2
+
+SQLITE_TABLE = """
+CREATE TABLE IF NOT EXISTS transacciones (
+    id TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    monto REAL NOT NULL,
+    descripcion TEXT NOT NULL DEFAULT ''
+);
+"""
+
+SQLITE_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transacciones_id ON transacciones (id);
+CREATE INDEX IF NOT EXISTS idx_transacciones_fecha ON transacciones (fecha);
+CREATE INDEX IF NOT EXISTS idx_transacciones_tipo ON transacciones (tipo);
+CREATE INDEX IF NOT EXISTS idx_transacciones_categoria ON transacciones (categoria);
+"""
+
+
+def close_after_setting():
+    # Cierre de años opcional: GESTIONAPP_CIERRE_DIAS=60 cierra cada año 60
+    # días después de terminado. Sin la variable ningún año se cierra solo
+    value = os.environ.get("GESTIONAPP_CIERRE_DIAS", "").strip()
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValueError(f"GESTIONAPP_CIERRE_DIAS debe ser una cantidad de días: '{value}'")
+    return int(value)
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+def date_key(value):
+    # Los límites de rango pueden llegar como datetime desde la interfaz
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def read_xlsx(filename):
+    # Devuelve las transacciones por ID y si hubo que asignar IDs nuevos.
+    # En modo read_only openpyxl recorre las filas sin armar el libro entero.
+    # openpyxl se importa solo al leer o escribir
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        sheet = workbook.active
+        transactions = {}
+        missing_ids = False
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            if row and row[0] is not None:
+                transaction = Transaction.from_row(dict(zip(COLUMNS, row)))
+                # Tipo y categoría se repiten mucho: una sola copia de cada texto
+                transaction.tipo = sys.intern(transaction.tipo)
+                transaction.categoria = sys.intern(transaction.categoria)
+                # Los libros anteriores no tienen columna ID
+                if not transaction.id:
+                    transaction.id = new_id()
+                    missing_ids = True
+                transactions[transaction.id] = transaction
+    finally:
+        workbook.close()
+    return transactions, missing_ids
+
+
+def write_xlsx(filename, transactions):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(COLUMNS))
+
+    for transaction in transactions:
+        row = transaction.to_row()
+        sheet.append([row[col] for col in COLUMNS])
+
+    # Se escribe al lado y se reemplaza: un corte a mitad de la escritura
+    # deja el libro anterior intacto
+    temp_path = filename + ".tmp"
+    workbook.save(temp_path)
+    replace_file(temp_path, filename)
+
+
+def replace_file(temp_path, path):
+    # Asegura en disco el archivo temporal y lo pone en lugar del definitivo
+    # de una sola vez: tras un corte queda el archivo viejo o el nuevo
+    with open(temp_path, "ab") as f:
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+
+
+def _fsync_dir(directory):
+    # El cambio de nombre queda en disco recién al sincronizar la carpeta;
+    # Windows no permite abrir carpetas
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def file_signature(filename):
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_snapshot(path, signature):
+    # Copia binaria del xlsx; solo vale si el xlsx no cambió desde que se hizo
+    try:
+        with open(path, "rb") as f:
+            version, saved_signature, rows = pickle.load(f)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+    if version != SNAPSHOT_VERSION or tuple(saved_signature) != signature:
+        return None
+
+    return {t.id: t for t in _unpack_rows(rows)}
+
+
+def write_snapshot(path, signature, transactions):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump((SNAPSHOT_VERSION, signature, _pack_rows(transactions)), f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+def _pack_rows(transactions):
+    return [
+        (t.id, t.fecha.toordinal(), t.tipo, t.categoria, t.monto, t.descripcion)
+        for t in transactions
+    ]
+
+
+def _unpack_rows(rows):
+    return [
+        Transaction(date.fromordinal(row[1]), row[2], row[3], row[4], row[5], row[0])
+        for row in rows
+    ]
+
+
+def write_chunk(path, year, transactions):
+    # Archivo inmutable de un año cerrado: primero un encabezado con la
+    # cantidad y los acumulados por período, después las filas. Leer el
+    # encabezado no lee las filas. Todo se guarda como tipos básicos (los
+    # acumulados en su forma to_state), así el archivo no depende de dónde
+    # estén las clases. Devuelve el encabezado
+    from gestion.rollups import PeriodRollups
+
+    transactions = list(transactions)
+    header = {
+        "version": CHUNK_VERSION,
+        "year": year,
+        "count": len(transactions),
+        "rollups": PeriodRollups.from_transactions(transactions).to_state()
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(_pack_rows(transactions), f, protocol=pickle.HIGHEST_PROTOCOL)
+    # Después de archivar, el xlsx deja de tener esas filas: el año tiene
+    # que estar en disco antes
+    replace_file(temp_path, path)
+    return header
+
+
+def read_chunk_headers(directory):
+    headers = {}
+    if not os.path.isdir(directory):
+        return headers
+    for name in os.listdir(directory):
+        if not name.endswith(".chunk"):
+            continue
+        header = _read_chunk_header(os.path.join(directory, name))
+        headers[header["year"]] = header
+    return headers
+
+
+def _read_chunk_header(path):
+    # Un archivo dañado o de otra versión se informa con su nombre en vez
+    # de un error de pickle sin contexto
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+        version = header["version"]
+    except (OSError, EOFError, ValueError, TypeError, KeyError, pickle.UnpicklingError) as e:
+        raise ValueError(f"No se pudo leer el archivo del año {path}: {e}") from e
+    if version != CHUNK_VERSION:
+        raise ValueError(f"Versión de archivo de año no soportada: {path}")
+    return header
+
+
+def read_chunk_rows(path):
+    try:
+        with open(path, "rb") as f:
+            pickle.load(f)
+            return _unpack_rows(pickle.load(f))
+    except (OSError, EOFError, ValueError, TypeError, IndexError, pickle.UnpicklingError) as e:
+        raise ValueError(f"No se pudo leer el archivo del año {path}: {e}") from e
+
+
+class TransactionJournal:
+    # Diario de solo anexado: una línea JSON por alta, edición o baja.
+    # Cada registro identifica la transacción por su ID, así que volver a
+    # aplicar el diario sobre un xlsx ya compactado no duplica cambios.
+    # Cada cambio se escribe al sistema operativo en el momento (sobrevive a
+    # un cierre abrupto del programa); el fsync que lo asegura ante un corte
+    # de luz se hace una vez por ventana de COMMIT_WINDOW segundos para todos
+    # los cambios que llegaron en ella
+    COMMIT_WINDOW = 0.05
+
+    def __init__(self, path):
+        self.path = path
+        # Diario apartado mientras se reescribe el xlsx en segundo plano
+        self.rotated_path = path + ".old"
+        self.entries = 0
+        # Registros escritos que todavía no pasaron por fsync
+        self.unsynced = 0
+        self._file = None
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def replay(self, transactions, repair=True):
+        # Recuperación al abrir: aplica los cambios que no llegaron al xlsx.
+        # Con repair se recorta la línea incompleta del final. Devuelve
+        # cuántos diarios tenían una
+        self.entries = 0
+        torn = 0
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                entries, complete = self._replay_file(path, transactions)
+                self.entries += entries
+                if complete is not None and repair:
+                    # Se recorta la línea a medio escribir; si no, el próximo
+                    # registro quedaría pegado a ella y también se perdería
+                    with open(path, "r+b") as f:
+                        f.truncate(complete)
+                    torn += 1
+        return torn
+
+    def _replay_file(self, path, transactions):
+        # Devuelve (registros aplicados, largo de la parte sana o None si
+        # el archivo está completo)
+        entries = 0
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última línea incompleta tras un cierre abrupto
+                    return entries, offset
+
+                if entry["op"] in ("add", "upd"):
+                    transaction = Transaction.from_row(entry["t"])
+                    transactions[transaction.id] = transaction
+                elif entry["op"] == "del":
+                    transactions.pop(entry["id"], None)
+                entries += 1
+                offset += len(line)
+        return entries, None
+
+    def append(self, op, **data):
+        self._write([json.dumps({"op": op, **data}, ensure_ascii=False) + "\n"])
+
+    def append_many(self, op, entries):
+        # Un lote de registros en una sola escritura
+        self._write([json.dumps({"op": op, **data}, ensure_ascii=False) + "\n" for data in entries])
+
+    def _write(self, lines):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+
+            self._file.write("".join(lines))
+            self._file.flush()
+            self.entries += len(lines)
+            self.unsynced += len(lines)
+            if self._timer is None:
+                self._timer = threading.Timer(self.COMMIT_WINDOW, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self):
+        # Commit en grupo: un solo fsync para todo lo escrito desde el anterior
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None and self.unsynced:
+                os.fsync(self._file.fileno())
+            self.unsynced = 0
+
+    def rotate(self):
+        # Aparta los cambios ya incluidos en una compactación en curso; los
+        # nuevos van a un diario vacío
+        self.close()
+        if os.path.exists(self.path):
+            if os.path.exists(self.rotated_path):
+                # Quedó un diario apartado de una compactación interrumpida
+                with open(self.rotated_path, "a", encoding="utf-8") as old, \
+                        open(self.path, encoding="utf-8") as current:
+                    old.write(current.read())
+                    old.flush()
+                    os.fsync(old.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+        self.entries = 0
+
+    def discard_rotated(self):
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def clear(self):
+        self.close()
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.entries = 0
+
+    def close(self):
+        with self._lock:
+            self.sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class DateIndex:
+    # Transacciones ordenadas por fecha con la lista de fechas en paralelo:
+    # un rango [start, end) es un bisect y un slice. Las de igual fecha
+    # quedan en orden de llegada
+    def __init__(self, transactions=()):
+        self.rows = sorted(transactions, key=lambda t: t.fecha)
+        self.keys = [t.fecha for t in self.rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def insert(self, transaction):
+        index = bisect_right(self.keys, transaction.fecha)
+        self.keys.insert(index, transaction.fecha)
+        self.rows.insert(index, transaction)
+
+    def extend(self, transactions):
+        # El sort es estable y Timsort aprovecha la parte ya ordenada: las
+        # nuevas quedan después de las existentes de igual fecha
+        self.rows.extend(transactions)
+        self.rows.sort(key=lambda t: t.fecha)
+        self.keys = [t.fecha for t in self.rows]
+
+    def remove(self, transaction):
+        index = self._find(transaction)
+        del self.keys[index]
+        del self.rows[index]
+
+    def replace(self, old, new):
+        if old.fecha == new.fecha:
+            self.rows[self._find(old)] = new
+        else:
+            self.remove(old)
+            self.insert(new)
+
+    def range(self, start, end):
+        return self.rows[bisect_left(self.keys, start):bisect_left(self.keys, end)]
+
+    def count(self, start, end):
+        return max(0, bisect_left(self.keys, end) - bisect_left(self.keys, start))
+
+    def _find(self, transaction):
+        # Solo se recorren las filas de la misma fecha
+        index = bisect_left(self.keys, transaction.fecha)
+        while index < len(self.rows) and self.keys[index] == transaction.fecha:
+            if self.rows[index].id == transaction.id:
+                return index
+            index += 1
+        raise KeyError(transaction.id)
+
+
+class XlsxStore:
+    # Cambios acumulados en el diario a partir de los cuales conviene
+    # reescribir el xlsx (ver needs_compaction)
+    COMPACT_THRESHOLD = 1000
+    def __init__(self, filename, close_after=None, read_only=False):
+        self.filename = filename
+        # Con close_after (días) cada año se cierra y pasa al archivo ese
+        # tiempo después de terminar; desde entonces sus transacciones no se
+        # pueden modificar hasta reabrirlo (ver reopen). Sin close_after no
+        # se cierra ningún año. Con read_only=True (reportes y lotes) no se
+        # escribe ningún archivo: otro proceso puede tener el libro abierto
+        self.read_only = read_only
+        self.close_after = None if close_after is None else timedelta(days=close_after)
+        self.archive_closed = self.close_after is not None and not read_only
+        base = os.path.splitext(filename)[0]
+        self.journal = TransactionJournal(base + ".journal")
+        self.snapshot_path = base + ".snapshot"
+        # Años cerrados: un archivo <año>.chunk por año; el xlsx guarda solo
+        # los años abiertos
+        self.archive_dir = base + ".archivo"
+        self.chunks = {}
+        self.loaded_years = set()
+        self.closed_through = self.last_closed_year()
+        self._newly_loaded = []
+        # Transacciones en memoria por ID, en orden de inserción, y las
+        # mismas ordenadas por fecha para las consultas por rango
+        self.transactions = {}
+        self.index = DateIndex()
+        # Protege self.transactions y el diario: la compactación y la carga
+        # pueden correr en un hilo de fondo
+        self._lock = threading.RLock()
+
+    def last_closed_year(self):
+        if self.close_after is None:
+            return None
+        return (date.today() - self.close_after).year - 1
+
+    def recover(self):
+        # Limpia lo que pudo dejar un cierre abrupto: los temporales de
+        # escrituras cortadas (el archivo definitivo sigue siendo el
+        # anterior). Devuelve si quedó una compactación a medias
+        temp_paths = [self.filename + ".tmp", self.snapshot_path + ".tmp"]
+        if os.path.isdir(self.archive_dir):
+            temp_paths += [os.path.join(self.archive_dir, name)
+                           for name in os.listdir(self.archive_dir) if name.endswith(".tmp")]
+        for path in temp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        return os.path.exists(self.journal.rotated_path)
+
+    def load(self):
+        # Los temporales y el diario de otro proceso que esté guardando no se tocan
+        interrupted = False if self.read_only else self.recover()
+        missing_ids = False
+        try:
+            signature = file_signature(self.filename)
+        except FileNotFoundError:
+            transactions = {}
+        else:
+            transactions = read_snapshot(self.snapshot_path, signature)
+            if transactions is None:
+                transactions, missing_ids = read_xlsx(self.filename)
+                if not missing_ids and not self.read_only:
+                    write_snapshot(self.snapshot_path, signature, transactions.values())
+
+        with self._lock:
+            self.journal.replay(transactions, repair=not self.read_only)
+            self.transactions = transactions
+            self.index = DateIndex(transactions.values())
+            self.chunks = read_chunk_headers(self.archive_dir)
+            self.loaded_years = set()
+            self._newly_loaded = []
+
+        # Los años que se cerraron desde la última vez pasan al archivo
+        closing = set()
+        if self.archive_closed:
+            closing = {t.fecha.year for t in transactions.values() if t.fecha.year <= self.closed_through}
+        if closing:
+            self.archive(closing)
+        # Guardar de inmediato los IDs asignados para que el diario los use, y
+        # terminar una compactación cortada para no arrastrar su diario
+        elif (missing_ids or interrupted) and not self.read_only:
+            self.compact()
+
+    def archive(self, years):
+        # Escribe cada año en su archivo (uniendo con el que ya exista, por
+        # si se cortó un cierre anterior) y recién después reescribe el xlsx
+        # sin esos años. Las filas archivadas salen de memoria
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with self._lock:
+            by_year = {}
+            for t in self.transactions.values():
+                if t.fecha.year in years:
+                    by_year.setdefault(t.fecha.year, []).append(t)
+
+        for year, rows in by_year.items():
+            path = self.chunk_path(year)
+            if year in self.chunks:
+                merged = {t.id: t for t in read_chunk_rows(path)}
+                merged.update((t.id, t) for t in rows)
+                rows = list(merged.values())
+            header = write_chunk(path, year, rows)
+            with self._lock:
+                self.chunks[year] = header
+
+        with self._lock:
+            for rows in by_year.values():
+                for t in rows:
+                    del self.transactions[t.id]
+            self.index = DateIndex(self.transactions.values())
+        self.compact()
+
+    def reopen(self, year):
+        # Devuelve un año archivado al xlsx para poder modificarlo: primero
+        # se reescribe el xlsx con sus filas y recién después se borra su
+        # archivo. Si se corta en el medio, repetirlo termina el trabajo
+        if self.read_only:
+            raise ValueError("El libro se abrió solo para lectura")
+        if self.closed_through is not None and year <= self.closed_through:
+            raise ValueError(f"El año {year} entra en el cierre automático (GESTIONAPP_CIERRE_DIAS) "
+                             "y se volvería a cerrar; desactívelo o auméntelo antes de reabrirlo")
+        if year not in self.chunks:
+            raise ValueError(f"El año {year} no está archivado")
+
+        self.ensure_loaded(date(year, 1, 1), date(year + 1, 1, 1))
+        with self._lock:
+            del self.chunks[year]
+            self.loaded_years.discard(year)
+        self.compact()
+        os.remove(self.chunk_path(year))
+        _fsync_dir(self.archive_dir)
+
+    def chunk_path(self, year):
+        return os.path.join(self.archive_dir, f"{year}.chunk")
+
+    def years_needed(self, start, end):
+        # Años archivados y todavía no cargados que tocan [start, end)
+        start, end = date_key(start), date_key(end)
+        return sorted(
+            year for year in self.chunks
+            if year not in self.loaded_years and date(year, 1, 1) < end and date(year, 12, 31) >= start
+        )
+
+    def needs_load(self, start, end):
+        return bool(self.years_needed(start, end))
+
+    def ensure_loaded(self, start, end):
+        # Carga a memoria los años archivados que hagan falta para el rango
+        for year in self.years_needed(start, end):
+            rows = read_chunk_rows(self.chunk_path(year))
+            with self._lock:
+                if year in self.loaded_years:
+                    continue
+                # Un cierre cortado deja filas del año también en el xlsx
+                rows = [t for t in rows if t.id not in self.transactions]
+                for t in rows:
+                    self.transactions[t.id] = t
+                self.index.extend(rows)
+                self.loaded_years.add(year)
+                self._newly_loaded.append(rows)
+
+    def take_loaded(self):
+        # Filas de años archivados cargados desde la última llamada
+        with self._lock:
+            loaded, self._newly_loaded = self._newly_loaded, []
+        return loaded
+
+    def take_changes(self):
+        # Solo un libro compartido (RemoteStore) recibe cambios de otros puestos
+        return []
+
+    def resident_transactions(self):
+        # Transacciones de los años abiertos (las que se cargan al iniciar)
+        with self._lock:
+            return [t for t in self.transactions.values() if t.fecha.year not in self.chunks]
+
+    def archived_rollups(self):
+        # Acumulados precalculados de cada año archivado, sin leer sus filas
+        from gestion.rollups import PeriodRollups
+        return [PeriodRollups.from_state(header["rollups"]) for header in self.chunks.values()]
+
+    def is_closed(self, fecha):
+        if self.closed_through is not None and fecha.year <= self.closed_through:
+            return True
+        return fecha.year in self.chunks
+
+    def _check_open(self, fecha):
+        if self.read_only:
+            raise ValueError("El libro se abrió solo para lectura")
+        if self.is_closed(fecha):
+            raise ValueError(f"El año {fecha.year} está cerrado y no admite cambios")
+
+    def get(self, transaction_id):
+        return self.transactions.get(transaction_id)
+
+    def add(self, transaction):
+        self._check_open(transaction.fecha)
+        with self._lock:
+            if transaction.id is None:
+                transaction.id = new_id()
+            self.transactions[transaction.id] = transaction
+            self.index.insert(transaction)
+            self.journal.append("add", t=transaction.to_row())
+        return transaction.id
+
+    def add_many(self, transactions):
+        # Alta en lote: un solo reordenamiento del índice y una sola
+        # escritura al diario
+        transactions = list(transactions)
+        for t in transactions:
+            self._check_open(t.fecha)
+        with self._lock:
+            added = []
+            for t in transactions:
+                if t.id is None:
+                    t.id = new_id()
+                self.transactions[t.id] = t
+                added.append(t)
+            self.index.extend(added)
+            self.journal.append_many("add", ({"t": t.to_row()} for t in added))
+
+    def update(self, transaction_id, transaction):
+        with self._lock:
+            old = self.transactions[transaction_id]
+            self._check_open(old.fecha)
+            self._check_open(transaction.fecha)
+            transaction.id = transaction_id
+            self.transactions[transaction_id] = transaction
+            self.index.replace(old, transaction)
+            self.journal.append("upd", t=transaction.to_row())
+
+    def remove(self, transaction_id):
+        with self._lock:
+            self._check_open(self.transactions[transaction_id].fecha)
+            self.index.remove(self.transactions.pop(transaction_id))
+            self.journal.append("del", id=transaction_id)
+
+    def range(self, start, end):
+        self.ensure_loaded(start, end)
+        with self._lock:
+            return self.index.range(date_key(start), date_key(end))
+
+    def iter_range(self, start, end, tipo=None):
+        for t in self.range(start, end):
+            if tipo is None or t.tipo == tipo:
+                yield t
+
+    def count(self, start, end):
+        self.ensure_loaded(start, end)
+        with self._lock:
+            return self.index.count(date_key(start), date_key(end))
+
+    def has_pending_changes(self):
+        return self.journal.entries > 0
+
+    def needs_compaction(self):
+        return self.journal.entries >= self.COMPACT_THRESHOLD
+
+    def compact(self):
+        if self.read_only:
+            raise ValueError("El libro se abrió solo para lectura")
+        # Se toma una copia bajo el candado y se escribe el xlsx sin él, así
+        # los cambios que lleguen mientras tanto van al diario nuevo
+        with self._lock:
+            # Los años archivados ya están en sus archivos
+            snapshot = [t for t in self.transactions.values() if t.fecha.year not in self.chunks]
+            self.journal.rotate()
+        write_xlsx(self.filename, snapshot)
+        write_snapshot(self.snapshot_path, file_signature(self.filename), snapshot)
+        self.journal.discard_rotated()
+
+    def close(self):
+        with self._lock:
+            self.journal.close()
+
+
+class SqliteStore:
+    def __init__(self, filename, read_only=False):
+        self.filename = filename
+        self.read_only = read_only
+        # Libro xlsx del que se importan los datos la primera vez
+        self.import_from = os.path.splitext(filename)[0] + ".xlsx"
+        self.connection = None
+        # La conexión se comparte entre el hilo de Tk y el de fondo
+        self._lock = threading.RLock()
+
+    def load(self):
+        if self.read_only:
+            # Sin crear, migrar ni importar nada
+            if not os.path.exists(self.filename):
+                raise FileNotFoundError(f"No existe el libro {self.filename}")
+            self.connection = sqlite3.connect(self._read_only_uri(), uri=True, check_same_thread=False)
+            return
+
+        with self._lock:
+            # El libro xlsx se importa a una base temporal que pasa a ser la
+            # definitiva recién al terminar: si la importación falla, la base
+            # no queda creada y vacía, y el próximo inicio lo vuelve a intentar
+            if not os.path.exists(self.filename) and os.path.exists(self.import_from):
+                temp_path = self.filename + ".tmp"
+                for path in (temp_path, temp_path + "-wal", temp_path + "-shm"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._connect(temp_path)
+                try:
+                    import_xlsx(self.import_from, self)
+                finally:
+                    self.connection.close()
+                replace_file(temp_path, self.filename)
+            self._connect(self.filename)
+
+    def _connect(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SQLITE_TABLE)
+        self._migrate()
+        self.connection.executescript(SQLITE_INDEXES)
+
+    def _migrate(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Las bases creadas sin columna id reciben un ID por fila
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(transacciones)")]
+            with self.connection:
+                if "id" not in columns:
+                    self.connection.execute("ALTER TABLE transacciones ADD COLUMN id TEXT")
+                    rowids = self.connection.execute("SELECT rowid FROM transacciones").fetchall()
+                    self.connection.executemany(
+                        "UPDATE transacciones SET id = ? WHERE rowid = ?",
+                        ((new_id(), rowid) for (rowid,) in rowids)
+                    )
+                self.connection.execute("PRAGMA user_version = 1")
+
+    def get(self, transaction_id):
+        with self._lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(SQL_COLUMNS)} FROM transacciones WHERE id = ?",
+                (transaction_id,)
+            ).fetchone()
+        return _from_sql(row) if row else None
+
+    def add(self, transaction):
+        self.add_many([transaction])
+        return transaction.id
+
+    def add_many(self, transactions):
+        rows = []
+        for t in transactions:
+            if t.id is None:
+                t.id = new_id()
+            rows.append(_to_sql(t))
+
+        with self._lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO transacciones ({', '.join(SQL_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in SQL_COLUMNS)})",
+                rows
+            )
+
+    def update(self, transaction_id, transaction):
+        transaction.id = transaction_id
+        assignments = ", ".join(f"{col} = ?" for col in SQL_COLUMNS[:-1])
+        with self._lock, self.connection:
+            cursor = self.connection.execute(
+                f"UPDATE transacciones SET {assignments} WHERE id = ?",
+                _to_sql(transaction)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(transaction_id)
+
+    def remove(self, transaction_id):
+        with self._lock, self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM transacciones WHERE id = ?", (transaction_id,)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(transaction_id)
+
+    def range(self, start, end):
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(SQL_COLUMNS)} FROM transacciones "
+                "WHERE fecha >= ? AND fecha < ? ORDER BY fecha, rowid",
+                (date_key(start).isoformat(), date_key(end).isoformat())
+            ).fetchall()
+        return [_from_sql(row) for row in rows]
+
+    def iter_range(self, start, end, tipo=None):
+        # Conexión propia de solo lectura: recorre el cursor fila por fila
+        # sin retener el candado de la conexión principal
+        query = (f"SELECT {', '.join(SQL_COLUMNS)} FROM transacciones "
+                 "WHERE fecha >= ? AND fecha < ?")
+        params = [date_key(start).isoformat(), date_key(end).isoformat()]
+        if tipo is not None:
+            query += " AND tipo = ?"
+            params.append(tipo)
+
+        connection = sqlite3.connect(self._read_only_uri(), uri=True)
+        try:
+            for row in connection.execute(query + " ORDER BY fecha, rowid", params):
+                yield _from_sql(row)
+        finally:
+            connection.close()
+
+    def _read_only_uri(self):
+        return f"file:{pathname2url(os.path.abspath(self.filename))}?mode=ro"
+
+    def count(self, start, end):
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM transacciones WHERE fecha >= ? AND fecha < ?",
+                (date_key(start).isoformat(), date_key(end).isoformat())
+            ).fetchone()[0]
+
+    # SQLite ya consulta por rango con su índice: no hay años archivados
+    def needs_load(self, start, end):
+        return False
+
+    def ensure_loaded(self, start, end):
+        pass
+
+    def take_loaded(self):
+        return []
+
+    def take_changes(self):
+        return []
+
+    def resident_transactions(self):
+        return list(self.iter_range(date.min, date.max))
+
+    def archived_rollups(self):
+        return []
+
+    def is_closed(self, fecha):
+        return False
+
+    def has_pending_changes(self):
+        # Cada cambio se confirma en el momento
+        return False
+
+    def needs_compaction(self):
+        return False
+
+    def compact(self):
+        with self._lock:
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+def _to_sql(transaction):
+    # Mismo orden que SQL_COLUMNS; en SQLite el monto se guarda en pesos
+    row = transaction.to_row()
+    return [row[col] for col in COLUMNS]
+
+
+def _from_sql(row):
+    return Transaction.from_row(dict(zip(COLUMNS, row)))
+
+
+def import_xlsx(xlsx_filename, store):
+    # Importación única de un libro existente, incluido su diario pendiente
+    source = XlsxStore(xlsx_filename)
+    source.load()
+    source.ensure_loaded(date.min, date.max)
+    store.add_many(source.transactions.values())
+    source.close()
+
+
+def open_store(filename, read_only=False):
+    # "tcp://host:puerto" o "unix:///ruta" apuntan a un servidor (python -m gestion serve)
+    if filename.startswith(("tcp://", "unix://")):
+        from gestion.remote import RemoteStore
+        return RemoteStore(filename)
+    if filename.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteStore(filename, read_only=read_only)
+    return XlsxStore(filename, close_after_setting(), read_only=read_only)
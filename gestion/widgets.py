@@ -0,0 +1,275 @@
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+from tkinter import ttk
+from gestion.charts import RenderCache, downsample
+
+
+class VirtualTable(ttk.Frame):
+    # Treeview virtual: las filas filtradas viven en self.rows y solo se
+    # crean items de Tk para la ventana visible más BUFFER filas por lado,
+    # así el costo de refrescar depende del alto de la tabla y no del libro
+    BUFFER = 20
+    WHEEL_ROWS = 3
+
+    def __init__(self, master, columns, values, key):
+        super().__init__(master)
+        # values(row) devuelve la tupla a mostrar; el iid de cada item es row.id.
+        # key(row) es la clave por la que self.rows está ordenada
+        self.values = values
+        self.key = key
+        self.rows = []
+        self.first = 0
+        self.selected_index = None
+        self._window = (0, 0)
+        self._rowheight = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", lambda e: self.scroll_to(self.first))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-self.WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(self.WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self._move_selection(self.visible_rows()))
+        self.tree.bind("<Home>", lambda e: self._select_at(0))
+        self.tree.bind("<End>", lambda e: self._select_at(len(self.rows) - 1))
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.first = 0
+        self.selected_index = None
+        self.scroll_to(0, force=True)
+
+    def set_order(self, key, rows):
+        # Cambia el criterio de orden; rows ya viene ordenada por key
+        self.key = key
+        self.set_rows(rows)
+
+    def insert_row(self, row):
+        # Inserta en su posición ordenada, después de las filas de igual clave
+        index = bisect_right(self.rows, self.key(row), key=self.key)
+        self.rows.insert(index, row)
+
+        if self.selected_index is not None and index <= self.selected_index:
+            self.selected_index += 1
+
+        start, end = self._window
+        if start <= index <= end:
+            self.tree.insert("", index - start, iid=row.id, values=self.values(row))
+            self._window = (start, end + 1)
+        elif index < start:
+            self._window = (start + 1, end + 1)
+        self.scroll_to(self.first)
+
+    def update_row(self, old_key, row):
+        index = self.find(row.id, old_key)
+        if index is None:
+            return
+        if self.key(row) != old_key:
+            self.remove_row(row.id, old_key)
+            self.insert_row(row)
+            return
+
+        self.rows[index] = row
+        if self.tree.exists(row.id):
+            self.tree.item(row.id, values=self.values(row))
+
+    def remove_row(self, row_id, key):
+        index = self.find(row_id, key)
+        if index is None:
+            return
+        del self.rows[index]
+
+        if self.selected_index == index:
+            self.selected_index = None
+        elif self.selected_index is not None and index < self.selected_index:
+            self.selected_index -= 1
+
+        start, end = self._window
+        if start <= index < end:
+            self.tree.delete(row_id)
+            self._window = (start, end - 1)
+        elif index < start:
+            self._window = (start - 1, end - 1)
+        self.scroll_to(self.first)
+
+    def find(self, row_id, key):
+        index = bisect_left(self.rows, key, key=self.key)
+        while index < len(self.rows) and self.key(self.rows[index]) == key:
+            if self.rows[index].id == row_id:
+                return index
+            index += 1
+        return None
+
+    def selection(self):
+        if self.selected_index is None:
+            return ()
+        return (self.rows[self.selected_index].id,)
+
+    def visible_rows(self):
+        # La primera fila de alto la ocupa el encabezado
+        return max(1, self.tree.winfo_height() // self._rowheight - 1)
+
+    def scroll_to(self, first, force=False):
+        visible = self.visible_rows()
+        total = len(self.rows)
+        first = max(0, min(first, total - visible))
+        last = min(total, first + visible)
+        self.first = first
+
+        start, end = self._window
+        if force or first < start or last > end:
+            self._materialize(max(0, first - self.BUFFER), min(total, last + self.BUFFER))
+            start, end = self._window
+
+        if end > start:
+            self.tree.yview_moveto((first - start) / (end - start))
+        if total:
+            self.scrollbar.set(first / total, last / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _materialize(self, start, end):
+        self.tree.delete(*self.tree.get_children())
+        for row in self.rows[start:end]:
+            self.tree.insert("", tk.END, iid=row.id, values=self.values(row))
+        self._window = (start, end)
+
+        if self.selected_index is not None and start <= self.selected_index < end:
+            self.tree.selection_set(self.rows[self.selected_index].id)
+
+    def _scroll_by(self, amount):
+        self.scroll_to(self.first + amount)
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_rows()
+            self._scroll_by(amount)
+
+    def _on_wheel(self, event):
+        return self._scroll_by(-self.WHEEL_ROWS if event.delta > 0 else self.WHEEL_ROWS)
+
+    def _on_select(self, event):
+        # Al desmaterializar la fila elegida Tk vacía la selección; el
+        # índice se conserva para restaurarla al volver a verla
+        selection = self.tree.selection()
+        if selection:
+            self.selected_index = self._window[0] + self.tree.index(selection[0])
+
+    def _move_selection(self, step):
+        if self.selected_index is None:
+            return self._select_at(self.first)
+        return self._select_at(self.selected_index + step)
+
+    def _select_at(self, index):
+        if not self.rows:
+            return "break"
+
+        index = max(0, min(len(self.rows) - 1, index))
+        self.selected_index = index
+
+        # Desplazar lo justo para que la fila quede a la vista
+        visible = self.visible_rows()
+        if index < self.first:
+            self.scroll_to(index)
+        elif index >= self.first + visible:
+            self.scroll_to(index - visible + 1)
+
+        row_id = self.rows[index].id
+        self.tree.selection_set(row_id)
+        self.tree.focus(row_id)
+        return "break"
+
+
+class LineChart(tk.Canvas):
+    # Gráfico de líneas sobre un Canvas. Cada serie se reduce a lo que cabe
+    # en el ancho (downsample) y las coordenadas ya calculadas se guardan
+    # por (clave de datos, tamaño), así redibujar al volver a un rango o
+    # tamaño anterior no recalcula nada
+    MARGIN = (60, 15, 15, 30)  # izquierda, arriba, derecha, abajo
+    REDRAW_MS = 100
+
+    def __init__(self, master, title, **kwargs):
+        super().__init__(master, background="white", highlightthickness=0, **kwargs)
+        self.title = title
+        self.key = None
+        self.labels = []
+        self.series = {}
+        self.colors = {}
+        self.format_value = str
+        self.cache = RenderCache()
+        self._pending = None
+        self.bind("<Configure>", lambda e: self._schedule_redraw())
+
+    def set_series(self, key, labels, series, colors, format_value=str):
+        # key identifica los datos (rango, período y versión de los
+        # acumulados); labels son las etiquetas del eje X, series un dict
+        # nombre -> valores alineados con labels
+        self.key = key
+        self.labels = labels
+        self.series = series
+        self.colors = colors
+        self.format_value = format_value
+        self.redraw()
+
+    def _schedule_redraw(self):
+        # Al arrastrar el borde de la ventana llegan decenas de <Configure>
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.REDRAW_MS, self.redraw)
+
+    def redraw(self):
+        self._pending = None
+        self.delete("all")
+        width, height = self.winfo_width(), self.winfo_height()
+        left, top, right, bottom = self.MARGIN
+        plot_width, plot_height = width - left - right, height - top - bottom
+        self.create_text(left, 2, text=self.title, anchor=tk.NW, font=("Helvetica", 10, "bold"))
+        if plot_width < 10 or plot_height < 10 or not self.labels or not self.series:
+            return
+
+        def compute():
+            low = min(0, *(min(values) for values in self.series.values()))
+            high = max(1, *(max(values) for values in self.series.values()))
+            step = plot_width / max(1, len(self.labels) - 1)
+            scale = plot_height / (high - low)
+            lines = {}
+            for name, values in self.series.items():
+                coords = []
+                for i, value in downsample(values, plot_width):
+                    coords += (left + i * step, top + plot_height - (value - low) * scale)
+                lines[name] = coords
+            return low, high, lines
+
+        low, high, lines = self.cache.get((self.key, width, height), compute)
+
+        # Ejes y referencias
+        self.create_line(left, top, left, top + plot_height, fill="#ced4da")
+        self.create_line(left, top + plot_height, left + plot_width, top + plot_height, fill="#ced4da")
+        for value, y in ((high, top), (low, top + plot_height)):
+            self.create_text(left - 5, y, text=self.format_value(value), anchor=tk.E, font=("Helvetica", 8))
+        self.create_text(left, top + plot_height + 5, text=self.labels[0], anchor=tk.NW, font=("Helvetica", 8))
+        self.create_text(left + plot_width, top + plot_height + 5, text=self.labels[-1],
+                         anchor=tk.NE, font=("Helvetica", 8))
+
+        # Líneas y leyenda
+        x = left + plot_width
+        for name, coords in reversed(list(lines.items())):
+            color = self.colors.get(name, "#343a40")
+            if len(coords) >= 4:
+                self.create_line(*coords, fill=color, width=2)
+            else:
+                self.create_oval(coords[0] - 2, coords[1] - 2, coords[0] + 2, coords[1] + 2, fill=color, outline=color)
+            label = self.create_text(x, 2, text=name, anchor=tk.NE, fill=color, font=("Helvetica", 9))
+            x = self.bbox(label)[0] - 10
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundWorker:
+    # Ejecuta tareas lentas (carga, guardado, PDF) en un único hilo, en el
+    # orden en que llegan, y entrega el resultado en el hilo de Tk con
+    # root.after para que la interfaz nunca se bloquee
+    POLL_MS = 50
+
+    def __init__(self, root, on_busy=None):
+        self.root = root
+        # on_busy(True/False) al empezar y terminar el trabajo pendiente
+        self.on_busy = on_busy
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._timers = {}
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        future = self._executor.submit(fn, *args)
+        self._set_pending(1)
+        self.root.after(self.POLL_MS, self._poll, future, on_done, on_error)
+        return future
+
+    def debounce(self, name, delay_ms, fn, *args):
+        # Agrupa llamadas seguidas con el mismo nombre: solo corre la última,
+        # delay_ms después de la última llamada
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            self.root.after_cancel(timer)
+        self._timers[name] = self.root.after(delay_ms, self._fire, name, fn, args)
+
+    def cancel_pending(self):
+        for timer in self._timers.values():
+            self.root.after_cancel(timer)
+        self._timers.clear()
+
+    def shutdown(self):
+        # Espera a que termine lo que ya está en cola
+        self.cancel_pending()
+        self._executor.shutdown(wait=True)
+
+    def _fire(self, name, fn, args):
+        del self._timers[name]
+        fn(*args)
+
+    def _poll(self, future, on_done, on_error):
+        if not future.done():
+            self.root.after(self.POLL_MS, self._poll, future, on_done, on_error)
+            return
+
+        self._set_pending(-1)
+        error = future.exception()
+        if error is not None:
+            if on_error is None:
+                raise error
+            on_error(error)
+        elif on_done is not None:
+            on_done(future.result())
+
+    def _set_pending(self, delta):
+        was_busy = self.pending > 0
+        self.pending += delta
+        if self.on_busy is not None and was_busy != (self.pending > 0):
+            self.on_busy(self.pending > 0)
@@ -1,12 +1,32 @@
 import tkinter as tk
 import os
-from tkinter import ttk, messagebox, Toplevel
-from datetime import datetime, timedelta
-from openpyxl import Workbook, load_workbook
+from tkinter import ttk, messagebox, filedialog, Toplevel
+from datetime import date, datetime, timedelta
 from tkcalendar import DateEntry
-from fpdf import FPDF
+from gestion.api import default_report_path, write_book_report
+from gestion.charts import RenderCache, auto_bucket, build_series
+from gestion.importers import import_statement, normalize_monto, rows_per_second
+from gestion.instrument import instrumentation
+from gestion.model import Transaction, format_monto, make_totals, monto_decimal, parse_fecha, parse_monto
+from gestion.rollups import PeriodRollups
+from gestion.remote import RemoteStore
+from gestion.search import SearchIndex
+from gestion.sorting import SortCache, sort_key
+from gestion.storage import open_store
+from gestion.widgets import LineChart, VirtualTable
+from gestion.worker import BackgroundWorker
 
 class FinanceApp:
+    # Espera tras el último cambio antes de compactar el libro
+    SAVE_DELAY_MS = 2000
+    # Cada cuánto se miran los cambios de otros puestos (libro compartido)
+    CHANGES_POLL_MS = 250
+    # Con más cambios juntos se rearma la tabla en vez de tocar fila por fila
+    MAX_INCREMENTAL = 50
+    # Opciones de agrupación del tablero; None elige según el largo del rango
+    CHART_BUCKETS = {"Auto": None, "Día": "day", "Semana": "week", "Mes": "month"}
+    CHART_COLORS = ('#2a73ff', '#fd7e14', '#6f42c1', '#20c997', '#e83e8c', '#6c757d')
+
     def __init__(self, root):
         self.root = root
         self.root.title("Gestionapp")
@@ -19,17 +39,39 @@ class FinanceApp:
         self.configure_styles()
         
         # Configurar almacenamiento
-        self.filename = "finanzas.xlsx"
-        self.transactions = []
+        self.filename = os.environ.get("GESTIONAPP_ARCHIVO", "finanzas.xlsx")
+        self.store = open_store(self.filename)
+        self.rollups = PeriodRollups()
+        self.search_index = SearchIndex()
+        self.worker = BackgroundWorker(self.root, on_busy=self.show_busy)
         
         # Variables de control
         self.selected_period = tk.StringVar(value="Día")
         self.selected_transaction = None
+        self.summary_text = tk.StringVar()
+        self.search_text = tk.StringVar()
+        self.search_category = tk.StringVar(value="Todas")
+        self.search_tipo = tk.StringVar(value="Todos")
+        self.search_min = tk.StringVar()
+        self.search_max = tk.StringVar()
+        self.search_active = False
+        # Libro compartido cuyo servidor dejó de responder
+        self.disconnected = False
+        self.sort_cache = SortCache()
+        # Series del tablero de gráficos ya calculadas, por rango y período
+        self.chart_cache = RenderCache()
+        self.sort_column = "Fecha"
+        self.sort_descending = False
+        self.measuring = tk.BooleanVar(value=instrumentation.enabled)
+        # Antes de crear los widgets: Tk guarda cada callback envuelto al
+        # registrarlo, y el menú Diagnóstico solo cambia enabled
+        instrumentation.install_tk_hook()
         
         # Crear interfaz
+        self.create_menu()
         self.create_widgets()
         self.load_transactions()
-        self.update_table()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def configure_styles(self):
         self.colors = {
@@ -136,6 +178,55 @@ class FinanceApp:
                            padding=8,
                            relief='flat')
         
+    def create_menu(self):
+        menubar = tk.Menu(self.root)
+        diagnostics = tk.Menu(menubar, tearoff=0)
+        diagnostics.add_checkbutton(label="Medir rendimiento", variable=self.measuring,
+                                    command=self.toggle_instrumentation)
+        diagnostics.add_command(label="Ver estadísticas", command=self.show_stats)
+        diagnostics.add_command(label="Guardar traza JSON...", command=self.save_trace)
+        diagnostics.add_separator()
+        diagnostics.add_command(label="Iniciar/detener perfil cProfile...", command=self.toggle_profile)
+        menubar.add_cascade(label="Diagnóstico", menu=diagnostics)
+        self.root.config(menu=menubar)
+
+    def toggle_instrumentation(self):
+        instrumentation.enabled = self.measuring.get()
+
+    def show_stats(self):
+        window = Toplevel(self.root)
+        window.title("Estadísticas de rendimiento")
+        text = tk.Text(window, width=100, height=30, font=('Courier', 9))
+        text.pack(fill=tk.BOTH, expand=True)
+
+        summary = instrumentation.summary()
+        if not summary:
+            text.insert(tk.END, "Sin mediciones. Active Diagnóstico > Medir rendimiento.")
+        for name, stat in sorted(summary.items(), key=lambda item: -item[1]["total_ms"]):
+            text.insert(tk.END, f"{name}\n  {stat['llamadas']} llamadas, total {stat['total_ms']:.1f} ms, "
+                                f"promedio {stat['promedio_ms']:.2f} ms, máx {stat['max_ms']:.1f} ms, "
+                                f"{stat['filas']} filas\n  {stat['histograma']}\n")
+        text.config(state=tk.DISABLED)
+
+    def save_trace(self):
+        path = filedialog.asksaveasfilename(title="Guardar traza", defaultextension=".json",
+                                            filetypes=[("Traza JSON", "*.json")])
+        if path:
+            instrumentation.dump_trace(path)
+            messagebox.showinfo("Diagnóstico", f"Traza guardada: {path}")
+
+    def toggle_profile(self):
+        if not instrumentation.profiling:
+            instrumentation.start_profile()
+            messagebox.showinfo("Diagnóstico", "Perfil iniciado. Vuelva a elegir la opción para guardarlo.")
+            return
+
+        path = filedialog.asksaveasfilename(title="Guardar perfil", defaultextension=".pstats",
+                                            filetypes=[("Perfil pstats", "*.pstats")])
+        if path:
+            instrumentation.stop_profile(path)
+            messagebox.showinfo("Diagnóstico", f"Perfil guardado: {path}")
+
     def create_widgets(self):
         # Frame principal
         main_frame = ttk.Frame(self.root)
@@ -163,30 +254,62 @@ class FinanceApp:
         period_selector.bind('<<ComboboxSelected>>', lambda e: self.update_table())
         period_selector.pack(side=tk.LEFT, padx=10)
         
+        # Indicador de trabajo en segundo plano (visible solo mientras hay tareas)
+        self.progress = ttk.Progressbar(control_frame, mode='indeterminate', length=80)
+        
         # Botones
         btn_frame = ttk.Frame(control_frame)
         btn_frame.pack(side=tk.LEFT)
         
-        ttk.Button(btn_frame, text="Nuevo", style='Primary.TButton', command=self.open_add_window).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Editar", style='Secondary.TButton', command=self.open_edit_window).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Eliminar", style='Secondary.TButton', command=self.delete_transaction).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Generar Reporte", style='Success.TButton', command=self.open_balance_window).pack(side=tk.LEFT, padx=5)
+        self.action_widgets = [
+            period_selector,
+            ttk.Button(btn_frame, text="Nuevo", style='Primary.TButton', command=self.open_add_window),
+            ttk.Button(btn_frame, text="Editar", style='Secondary.TButton', command=self.open_edit_window),
+            ttk.Button(btn_frame, text="Eliminar", style='Secondary.TButton', command=self.delete_transaction),
+            ttk.Button(btn_frame, text="Importar", style='Secondary.TButton', command=self.import_statement),
+            ttk.Button(btn_frame, text="Generar Reporte", style='Success.TButton', command=self.open_balance_window),
+            ttk.Button(btn_frame, text="Gráficos", style='Secondary.TButton', command=self.open_dashboard_window)
+        ]
+        for button in self.action_widgets[1:]:
+            button.pack(side=tk.LEFT, padx=5)
+        
+        # Barra de búsqueda: filtra en cada tecla usando el índice de búsqueda
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.search_text, width=30).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(search_frame, text="Categoría:").pack(side=tk.LEFT)
+        self.category_filter = ttk.Combobox(search_frame, textvariable=self.search_category,
+                                            values=["Todas"], state='readonly', width=15)
+        self.category_filter.pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(search_frame, text="Tipo:").pack(side=tk.LEFT)
+        ttk.Combobox(search_frame, textvariable=self.search_tipo, values=["Todos", "Ingreso", "Gasto"],
+                     state='readonly', width=10).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(search_frame, text="Monto entre:").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.search_min, width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(search_frame, text="y").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.search_max, width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_frame, text="Limpiar", style='Secondary.TButton',
+                   command=self.clear_search).pack(side=tk.LEFT, padx=10)
+        
+        for var in (self.search_text, self.search_category, self.search_tipo, self.search_min, self.search_max):
+            var.trace_add("write", lambda *args: self.update_table())
         
         # Tabla
         columns = ("Fecha", "Tipo", "Categoría", "Monto", "Descripción")
-        self.tree = ttk.Treeview(
-            main_frame,
-            columns=columns,
-            show="headings",
-            selectmode="browse"
-        )
+        self.table = VirtualTable(main_frame, columns, self.row_values, key=lambda t: t.fecha)
         
         for col in columns:
-            self.tree.heading(col, text=col, anchor=tk.CENTER)
-            self.tree.column(col, width=120, anchor=tk.CENTER)
+            self.table.tree.heading(col, text=col, anchor=tk.CENTER, command=lambda c=col: self.sort_by(c))
+            self.table.tree.column(col, width=120, anchor=tk.CENTER)
+        self.update_headings()
             
-        self.tree.column("Descripción", width=300)
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.table.tree.column("Descripción", width=300)
+        self.table.pack(fill=tk.BOTH, expand=True)
+        
+        # Resumen del período, calculado con los acumulados por período
+        ttk.Label(main_frame, textvariable=self.summary_text).pack(anchor=tk.E, pady=(10, 0))
 
     def open_balance_window(self):
         self.balance_window = Toplevel(self.root)
@@ -224,6 +347,76 @@ class FinanceApp:
         ttk.Button(btn_frame, text="Cancelar", style='Secondary.TButton',
                  command=self.balance_window.destroy).pack(side=tk.LEFT, padx=10)
 
+    def open_dashboard_window(self):
+        self.dashboard_window = Toplevel(self.root)
+        self.dashboard_window.title("Gráficos")
+        self.dashboard_window.geometry("900x600")
+        self.dashboard_window.configure(bg='#f5f6fa')
+
+        main_frame = ttk.Frame(self.dashboard_window)
+        main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
+
+        # Rango y período de agrupación
+        controls = ttk.Frame(main_frame)
+        controls.pack(fill=tk.X, pady=(0, 10))
+
+        today = date.today()
+        ttk.Label(controls, text="Desde:").pack(side=tk.LEFT)
+        self.chart_start = DateEntry(controls, date_pattern='yyyy-mm-dd', background='#2a73ff',
+                                     foreground='white', bordercolor='#ced4da')
+        self.chart_start.set_date(today.replace(year=today.year - 1, day=1))
+        self.chart_start.pack(side=tk.LEFT, padx=(5, 15))
+
+        ttk.Label(controls, text="Hasta:").pack(side=tk.LEFT)
+        self.chart_end = DateEntry(controls, date_pattern='yyyy-mm-dd', background='#2a73ff',
+                                   foreground='white', bordercolor='#ced4da')
+        self.chart_end.set_date(today)
+        self.chart_end.pack(side=tk.LEFT, padx=(5, 15))
+
+        ttk.Label(controls, text="Agrupar por:").pack(side=tk.LEFT)
+        self.chart_bucket = tk.StringVar(value="Auto")
+        bucket_selector = ttk.Combobox(controls, textvariable=self.chart_bucket, state="readonly", width=8,
+                                       values=list(self.CHART_BUCKETS))
+        bucket_selector.bind('<<ComboboxSelected>>', lambda e: self.update_dashboard())
+        bucket_selector.pack(side=tk.LEFT, padx=(5, 15))
+
+        ttk.Button(controls, text="Actualizar", style='Primary.TButton',
+                   command=self.update_dashboard).pack(side=tk.LEFT)
+
+        self.balance_chart = LineChart(main_frame, "Ingresos vs Gastos")
+        self.balance_chart.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.category_chart = LineChart(main_frame, "Gastos por categoría")
+        self.category_chart.pack(fill=tk.BOTH, expand=True)
+
+        self.update_dashboard()
+
+    def update_dashboard(self):
+        try:
+            start = datetime.strptime(self.chart_start.get(), "%Y-%m-%d").date()
+            end = datetime.strptime(self.chart_end.get(), "%Y-%m-%d").date() + timedelta(days=1)
+            if start >= end:
+                raise ValueError("La fecha de inicio debe ser anterior a la fecha final")
+        except ValueError as e:
+            messagebox.showerror("Error", f"Datos inválidos: {str(e)}", parent=self.dashboard_window)
+            return
+
+        bucket = self.CHART_BUCKETS[self.chart_bucket.get()] or auto_bucket(start, end)
+        # Las series salen de los acumulados (incluidos los años archivados);
+        # la versión en la clave invalida lo cacheado al editar
+        key = (start, end, bucket, self.rollups.version)
+        series = self.chart_cache.get(key, lambda: build_series(self.rollups, start, end, bucket))
+
+        # Día y semana se rotulan con su fecha de inicio; mes con año y mes
+        labels = [day.strftime("%Y-%m" if bucket == "month" else "%Y-%m-%d") for day in series.fechas]
+        self.balance_chart.set_series(
+            key, labels, {"Ingresos": series.ingresos, "Gastos": series.gastos},
+            {"Ingresos": self.colors['success'], "Gastos": self.colors['danger']}, format_monto
+        )
+        self.category_chart.set_series(
+            key, labels, series.categorias,
+            dict(zip(series.categorias, self.CHART_COLORS)), format_monto
+        )
+
     def generate_pdf_report(self):
         try:
             start = datetime.strptime(self.start_date.get(), "%Y-%m-%d")
@@ -232,192 +425,332 @@ class FinanceApp:
             if start > end:
                 raise ValueError("La fecha de inicio debe ser anterior a la fecha final")
                 
-            filtered = [
-                t for t in self.transactions
-                if start <= datetime.strptime(t["Fecha"], "%Y-%m-%d") <= end
-            ]
-            
-            if not filtered:
+            _, cantidad = self.rollups.totals(start.date(), end.date() + timedelta(days=1))
+            if not cantidad:
                 messagebox.showwarning("Advertencia", "No hay transacciones en el rango seleccionado")
                 return
-                
-            # Calcular totales
-            ingresos = sum(float(t["Monto"]) for t in filtered if t["Tipo"] == "Ingreso")
-            gastos = sum(float(t["Monto"]) for t in filtered if t["Tipo"] == "Gasto")
-            ganancia = ingresos - gastos
-            margen = (ganancia / ingresos * 100) if ingresos != 0 else 0
-            
-            # Separar transacciones
-            ingresos_lista = [t for t in filtered if t["Tipo"] == "Ingreso"]
-            gastos_lista = [t for t in filtered if t["Tipo"] == "Gasto"]
-
-            # Configurar PDF
-            pdf = FPDF(orientation='P', unit='mm', format='A4')
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-            
-            # Estilos
-            pdf.set_draw_color(34, 119, 255)
-            pdf.set_line_width(0.3)
-            
-            # Encabezado 
-            pdf.set_font('Arial', 'B', 16)
-            pdf.cell(0, 10, 'Reporte Financiero', 0, 1, 'C')
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, f'Periodo: {start.strftime("%d/%m/%Y")} - {end.strftime("%d/%m/%Y")}', 0, 1, 'C')
-            pdf.ln(10)
-
-            # Tabla de Ingresos
-            if ingresos_lista:
-                pdf.set_font('Arial', 'B', 12)
-                pdf.cell(0, 8, 'Ingresos', 0, 1)
-                self.generar_tabla_con_total(pdf, ingresos_lista, "Ingresos Totales:")
-                pdf.ln(8)
-
-            # Tabla de Gastos
-            if gastos_lista:
-                pdf.set_font('Arial', 'B', 12)
-                pdf.cell(0, 8, 'Gastos', 0, 1)
-                self.generar_tabla_con_total(pdf, gastos_lista, "Gastos Totales:")
-                pdf.ln(10)
-            
-            # Resumen financiero
-            pdf.ln(10)
-            pdf.set_font('Arial', 'B', 12)
-            pdf.set_fill_color(245, 245, 245)  # Gris claro
-            pdf.cell(0, 10, 'Resumen General', 0, 1, 'L')
-            
-            pdf.set_font('Times', 'B', 11)
-            pdf.cell(60, 8, 'Concepto', 1, 0, 'C', True)
-            pdf.cell(60, 8, 'Monto', 1, 1, 'C', True)
-            
-            pdf.set_font('Times', '', 11)
-            data = [
-                ('Ingresos Totales', f"${ingresos:,.2f}"),
-                ('Gastos Totales', f"${gastos:,.2f}"),
-                ('Ganancia Neta', f"${ganancia:,.2f}"),
-                ('Margen de Ganancia', f"{margen:.1f}%")
-            ]
-            
-            for label, value in data:
-                pdf.cell(60, 8, label, 1, 0, 'L')
-                pdf.cell(60, 8, value, 1, 1, 'R')
-            
-            # Pie de página
-            pdf.set_y(-20)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.cell(0, 5, 'Este reporte fue generado automáticamente por gestionapp', 0, 0, 'C')
-            # pdf.ln(5)
-            # pdf.cell(0, 5, f'Generado el: {datetime.now().strftime("%d/%m/%Y %H:%M")}', 0, 0, 'C')
-            
-            # Guardar archivo
-            if not os.path.exists(os.path.join("Reportes")):
-                os.makedirs(os.path.join("Reportes"))
 
-            filename = f"Reporte_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
-            pathPDF = os.path.join("Reportes", filename)
-            pdf.output(pathPDF)
-            
-            messagebox.showinfo("Éxito", f"Reporte generado: {filename}")
-            self.balance_window.destroy()
-            
         except ValueError as e:
             messagebox.showerror("Error", f"Datos inválidos: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Ocurrió un error: {str(e)}")
-
-    def generar_tabla_con_total(self, pdf, datos, texto_total):
-        # Configurar columnas
-        columnas = ['Fecha', 'Categoría', 'Descripción', 'Monto']
-        anchos = [25, 35, 80, 25]
-        
-        # Encabezado
-        pdf.set_fill_color(240, 245, 255)
-        pdf.set_font('Arial', 'B', 10)
-        for ancho, col in zip(anchos, columnas):
-            pdf.cell(ancho, 8, col, 1, 0, 'C', True)
-        pdf.ln()
-        
-        # Filas
-        pdf.set_font('Times', '', 10)
-        total = 0
-        fill = False
-        
-        for item in datos:
-            total += float(item['Monto'])
-            
-            # Formatear descripción multilínea
-            desc = item['Descripción'].replace('\n', ' ')
-            
-            pdf.cell(anchos[0], 8, item['Fecha'], 1, 0, 'C', fill)
-            pdf.cell(anchos[1], 8, item['Categoría'], 1, 0, 'C', fill)
-            
-            # Celda de descripción con ajuste
-            x = pdf.get_x()
-            y = pdf.get_y()
-            pdf.multi_cell(anchos[2], 8, desc, 1, 'L', fill)
-            pdf.set_xy(x + anchos[2], y)
-            
-            pdf.cell(anchos[3], 8, f"${float(item['Monto']):.2f}", 1, 0, 'R', fill)
-            pdf.ln(8)
-            fill = not fill
-        
-        # Fila de total
-        pdf.set_font('Times', 'B', 10)
-        pdf.set_fill_color(220, 230, 255)
-        pdf.cell(sum(anchos[:-1]), 8, texto_total, 1, 0, 'R', True)
-        pdf.cell(anchos[3], 8, f"${total:.2f}", 1, 1, 'R', True)
+            return
+
+        # El PDF se arma en segundo plano
+        self.worker.submit(
+            self.build_pdf_report, start, end,
+            on_done=self.on_report_done,
+            on_error=lambda e: messagebox.showerror("Error", f"Ocurrió un error: {str(e)}")
+        )
+
+    def on_report_done(self, filename):
+        messagebox.showinfo("Éxito", f"Reporte generado: {filename}")
+        if self.balance_window.winfo_exists():
+            self.balance_window.destroy()
+
+    def build_pdf_report(self, start, end):
+        # Las filas se leen del almacenamiento a medida que se escriben
+        with instrumentation.span("generate_pdf_report") as info:
+            pathPDF = default_report_path()
+            write_book_report(self.store, pathPDF, start, end)
+            if instrumentation.enabled:
+                info["filas"] = self.store.count(start, end + timedelta(days=1))
+        return os.path.basename(pathPDF)
 
     def update_table(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
         start, end = self.get_period_range()
-        
-        for transaction in self.transactions:
-            trans_date = datetime.strptime(transaction["Fecha"], "%Y-%m-%d")
-            if start <= trans_date < end:
-                self.tree.insert("", tk.END, values=(
-                    transaction["Fecha"],
-                    transaction["Tipo"],
-                    transaction["Categoría"],
-                    f"${float(transaction['Monto']):.2f}",
-                    transaction["Descripción"]
-                ))
+        if self.store.needs_load(start, end):
+            # Los años archivados del rango se cargan en segundo plano y la
+            # tabla se vuelve a armar al terminar
+            self.worker.submit(
+                self.store.ensure_loaded, start, end,
+                on_done=lambda _: self.update_table(),
+                on_error=lambda e: messagebox.showerror("Error", f"No se pudo cargar el archivo: {str(e)}")
+            )
+            return
+        self.index_loaded_years()
+
+        with instrumentation.span("update_table") as info:
+            ids = self.search_index.search(**self.search_filter())
+            self.search_active = ids is not None
+            if ids is None:
+                rows = self.store.range(start, end)
+            else:
+                # Solo se recorren los resultados de la búsqueda
+                start, end = start.date(), end.date()
+                rows = sorted(
+                    (t for t in map(self.search_index.rows.get, ids) if start <= t.fecha < end),
+                    key=lambda t: t.fecha
+                )
+            self.sort_cache.reset(rows)
+            self.show_sorted()
+            self.update_summary()
+            info["filas"] = len(rows)
+
+    def sort_by(self, column):
+        # Un segundo clic en la misma columna invierte el orden
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        self.update_headings()
+        self.show_sorted()
+
+    def show_sorted(self):
+        # El orden sale de la caché; la tabla recibe su propia copia
+        rows = self.sort_cache.get(self.sort_column, self.sort_descending)
+        self.table.set_order(sort_key(self.sort_column, self.sort_descending), list(rows))
+
+    def update_headings(self):
+        for col in self.table.tree["columns"]:
+            arrow = ""
+            if col == self.sort_column:
+                arrow = " ▼" if self.sort_descending else " ▲"
+            self.table.tree.heading(col, text=col + arrow)
+
+    def index_loaded_years(self):
+        # Suma al índice de búsqueda las filas de años archivados que se
+        # cargaron (por la tabla o por un reporte); los acumulados por
+        # período ya las incluían
+        loaded = self.store.take_loaded()
+        for rows in loaded:
+            self.search_index.add_many(rows)
+        if loaded:
+            self.update_category_choices()
+
+    def search_filter(self):
+        # Filtros de la barra de búsqueda; un monto mal escrito se ignora
+        # mientras se está tipeando
+        search = {"text": self.search_text.get()}
+        if self.search_category.get() != "Todas":
+            search["categoria"] = self.search_category.get()
+        if self.search_tipo.get() != "Todos":
+            search["tipo"] = self.search_tipo.get()
+        for key, var in (("minimo", self.search_min), ("maximo", self.search_max)):
+            try:
+                search[key] = abs(normalize_monto(var.get())) if var.get().strip() else None
+            except ValueError:
+                pass
+        return search
+
+    def clear_search(self):
+        for var, value in ((self.search_text, ""), (self.search_category, "Todas"),
+                           (self.search_tipo, "Todos"), (self.search_min, ""), (self.search_max, "")):
+            var.set(value)
+
+    def update_category_choices(self):
+        self.category_filter.config(values=["Todas"] + self.search_index.category_names())
+
+    def update_summary(self):
+        if self.search_active:
+            # Totales de los resultados de la búsqueda, que ya están en la tabla
+            rows = self.table.rows
+            resumen = make_totals(sum(t.monto for t in rows if t.tipo == "Ingreso"),
+                                  sum(t.monto for t in rows if t.tipo == "Gasto"))
+            cantidad = len(rows)
+        else:
+            start, end = (d.date() for d in self.get_period_range())
+            resumen, cantidad = self.rollups.totals(start, end)
+        self.summary_text.set(
+            f"Ingresos: {format_monto(resumen.ingresos)}    "
+            f"Gastos: {format_monto(resumen.gastos)}    "
+            f"Balance: {format_monto(resumen.ganancia)}    "
+            f"({cantidad} movimientos)"
+        )
+
+    def import_statement(self):
+        path = filedialog.askopenfilename(
+            title="Importar extracto",
+            filetypes=[("Extractos bancarios", "*.csv *.ofx *.qfx *.xlsx"), ("Todos los archivos", "*.*")]
+        )
+        if not path:
+            return
+
+        # Lectura, validación y alta en lote en segundo plano
+        self.set_actions_enabled(False)
+        self.worker.submit(
+            import_statement, path, self.store,
+            on_done=self.on_statement_imported,
+            on_error=self.on_import_error
+        )
+
+    def on_statement_imported(self, result):
+        for transaction in result.agregadas:
+            self.rollups.add(transaction)
+            self.search_index.add(transaction)
+        self.update_category_choices()
+        self.set_actions_enabled(True)
+        # Un solo refresco de la tabla y un solo guardado para todo el lote
+        self.update_table()
+        if result.agregadas:
+            self.save_transactions()
+
+        message = (f"{len(result.agregadas)} transacciones importadas "
+                   f"({rows_per_second(result):,.0f} filas/s)")
+        if result.duplicadas:
+            message += f"\n{result.duplicadas} ya estaban en el libro"
+        if result.errores:
+            message += f"\n{len(result.errores)} filas con errores:\n"
+            message += "\n".join(f"Línea {line}: {error}" for line, error in result.errores[:10])
+            messagebox.showwarning("Importación", message)
+        else:
+            messagebox.showinfo("Importación", message)
+
+    def on_import_error(self, error):
+        self.set_actions_enabled(True)
+        messagebox.showerror("Error", f"No se pudo importar: {str(error)}")
+
+    def refresh_row(self, old, new):
+        # Actualiza solo la fila afectada por un alta, edición o baja, y los
+        # acumulados por período
+        if old is not None:
+            self.rollups.remove(old)
+            self.search_index.remove(old)
+        if new is not None:
+            self.rollups.add(new)
+            self.search_index.add(new)
+        self.update_category_choices()
+
+        # Con una búsqueda activa la fila puede entrar o salir de los
+        # resultados: se rearma la lista filtrada, que es corta
+        if self.search_active:
+            self.update_table()
+            return
+        self.update_summary()
+
+        start, end = (d.date() for d in self.get_period_range())
+        old_visible = old is not None and start <= old.fecha < end
+        new_visible = new is not None and start <= new.fecha < end
+
+        if old_visible:
+            self.sort_cache.remove(old)
+        if new_visible:
+            self.sort_cache.insert(new)
+
+        key = self.table.key
+        if old_visible and new_visible:
+            self.table.update_row(key(old), new)
+        elif old_visible:
+            self.table.remove_row(old.id, key(old))
+        elif new_visible:
+            self.table.insert_row(new)
+
+    def row_values(self, transaction):
+        return (
+            transaction.fecha.isoformat(),
+            transaction.tipo,
+            transaction.categoria,
+            format_monto(transaction.monto),
+            transaction.descripcion
+        )
         
     def load_transactions(self):
+        # La carga corre en segundo plano; las acciones se habilitan al terminar
+        self.set_actions_enabled(False)
+        self.worker.submit(
+            self.load_book,
+            on_done=self.on_transactions_loaded,
+            on_error=lambda e: messagebox.showerror("Error", f"No se pudo cargar {self.filename}: {str(e)}")
+        )
+
+    def load_book(self):
+        # Carga el libro y arma los acumulados por período y el índice de
+        # búsqueda. Los años archivados no se leen: aportan sus acumulados
+        with instrumentation.span("load_transactions") as info:
+            self.store.load()
+            transactions = self.store.resident_transactions()
+            rollups = PeriodRollups.from_transactions(transactions)
+            for archived in self.store.archived_rollups():
+                rollups.merge(archived)
+            search_index = SearchIndex.from_transactions(transactions)
+            info["filas"] = len(transactions)
+        return rollups, search_index
+
+    def on_transactions_loaded(self, result):
+        self.rollups, self.search_index = result
+        self.update_category_choices()
+        self.set_actions_enabled(True)
+        self.update_table()
+        self.root.after(self.CHANGES_POLL_MS, self.poll_changes)
+
+    def poll_changes(self):
+        # Con GESTIONAPP_ARCHIVO=tcp://... o unix://... el libro está en un
+        # servidor y los cambios de los demás puestos llegan aquí
+        if self.disconnected:
+            return
         try:
-            workbook = load_workbook(self.filename)
-            sheet = workbook.active
-            self.transactions = []
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if row:
-                    self.transactions.append({
-                        "Fecha": row[0],
-                        "Tipo": row[1],
-                        "Categoría": row[2],
-                        "Monto": row[3],
-                        "Descripción": row[4]
-                    })
-        except FileNotFoundError:
-            self.transactions = []
+            changes = self.store.take_changes()
+        except OSError as e:
+            self.on_disconnected(e)
+            return
+
+        if len(changes) > self.MAX_INCREMENTAL:
+            for old, new in changes:
+                if old is not None:
+                    self.rollups.remove(old)
+                    self.search_index.remove(old)
+                if new is not None:
+                    self.rollups.add(new)
+                    self.search_index.add(new)
+            self.update_category_choices()
+            self.update_table()
+        else:
+            for old, new in changes:
+                self.refresh_row(old, new)
+        self.root.after(self.CHANGES_POLL_MS, self.poll_changes)
             
+    def on_disconnected(self, error):
+        # Sin servidor no hay cambios posibles: la tabla queda a la vista
+        # pero se bloquean las acciones hasta reabrir la aplicación
+        if self.disconnected:
+            return
+        self.disconnected = True
+        self.set_actions_enabled(False)
+        self.root.title("Gestionapp (sin conexión con el servidor)")
+        messagebox.showerror(
+            "Error",
+            f"Se perdió la conexión con el servidor ({error}). Los cambios guardados "
+            "antes del corte están en el servidor; vuelva a abrir la aplicación para seguir."
+        )
+
     def save_transactions(self):
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.append(["Fecha", "Tipo", "Categoría", "Monto", "Descripción"])
-        
-        for transaction in self.transactions:
-            sheet.append([
-                transaction["Fecha"],
-                transaction["Tipo"],
-                transaction["Categoría"],
-                transaction["Monto"],
-                transaction["Descripción"]
-            ])
-        
-        workbook.save(self.filename)
-        self.update_table()
+        # Reescribe el xlsx completo y vacía el diario de cambios, en segundo plano
+        self.worker.submit(
+            self.compact_book,
+            on_error=lambda e: messagebox.showerror("Error", f"No se pudo guardar: {str(e)}")
+        )
+
+    def compact_book(self):
+        with instrumentation.span("save_transactions") as info:
+            self.store.compact()
+            # Solo las filas de los años abiertos: contar todo el libro
+            # cargaría los años archivados
+            if instrumentation.enabled:
+                info["filas"] = len(self.store.resident_transactions())
+
+    def request_save(self):
+        # Compacta cuando el diario creció lo suficiente; los cambios seguidos
+        # se agrupan en una sola escritura
+        if self.store.needs_compaction():
+            self.worker.debounce("guardar", self.SAVE_DELAY_MS, self.save_transactions)
+
+    def on_close(self):
+        self.worker.shutdown()
+        if self.store.has_pending_changes():
+            self.store.compact()
+        self.store.close()
+        self.root.destroy()
+
+    def show_busy(self, busy):
+        if busy:
+            self.progress.pack(side=tk.LEFT, padx=10)
+            self.progress.start(10)
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
+
+    def set_actions_enabled(self, enabled):
+        enabled = enabled and not self.disconnected
+        for widget in self.action_widgets:
+            widget.state(['!disabled'] if enabled else ['disabled'])
     
     def get_period_range(self):
         today = datetime.today()
@@ -440,12 +773,12 @@ class FinanceApp:
         self.transaction_window("Agregar Transacción")
         
     def open_edit_window(self):
-        selected_item = self.tree.selection()
+        selected_item = self.table.selection()
         if not selected_item:
             messagebox.showwarning("Advertencia", "Seleccione una transacción para editar")
             return
             
-        self.selected_transaction = self.tree.item(selected_item)["values"]
+        self.selected_transaction = self.store.get(selected_item[0])
         self.transaction_window("Editar Transacción", edit_mode=True)
     
     def transaction_window(self, title, edit_mode=False):
@@ -461,11 +794,11 @@ class FinanceApp:
         
         if edit_mode:
             default_values = [
-                self.selected_transaction[0],
-                self.selected_transaction[1],
-                self.selected_transaction[2],
-                self.selected_transaction[3][1:],
-                self.selected_transaction[4]
+                self.selected_transaction.fecha.isoformat(),
+                self.selected_transaction.tipo,
+                self.selected_transaction.categoria,
+                str(monto_decimal(self.selected_transaction.monto)),
+                self.selected_transaction.descripcion
             ]
         else:
             default_values = [
@@ -525,50 +858,57 @@ class FinanceApp:
         
     def save_transaction(self, fields, window, edit_mode):
         try:
-            new_transaction = {
-                "Fecha": fields["Fecha (AAAA-MM-DD):"].get(),
-                "Tipo": fields["Tipo:"].get(),
-                "Categoría": fields["Categoría:"].get(),
-                "Monto": float(fields["Monto:"].get()),
-                "Descripción": fields["Descripción:"].get("1.0", tk.END).strip()
-            }
-            
-            datetime.strptime(new_transaction["Fecha"], "%Y-%m-%d")
+            new_transaction = Transaction(
+                parse_fecha(fields["Fecha (AAAA-MM-DD):"].get()),
+                fields["Tipo:"].get(),
+                fields["Categoría:"].get(),
+                parse_monto(fields["Monto:"].get()),
+                fields["Descripción:"].get("1.0", tk.END).strip()
+            )
             
             if edit_mode:
-                for i, t in enumerate(self.transactions):
-                    if t["Fecha"] == self.selected_transaction[0] and t["Descripción"] == str(self.selected_transaction[4]):
-                        del self.transactions[i]
-                        break
-            
-            self.transactions.append(new_transaction)
-            self.save_transactions()
-            self.update_table()
+                # En un libro compartido la fila pudo cambiar desde otro puesto
+                # mientras se editaba: los acumulados tienen la versión nueva
+                if isinstance(self.store, RemoteStore):
+                    current = self.store.get(self.selected_transaction.id)
+                    if current is None or current.to_row() != self.selected_transaction.to_row():
+                        raise ValueError("la transacción cambió mientras se editaba")
+                self.store.update(self.selected_transaction.id, new_transaction)
+                self.refresh_row(self.selected_transaction, new_transaction)
+            else:
+                self.store.add(new_transaction)
+                self.refresh_row(None, new_transaction)
+            self.request_save()
             window.destroy()
             
         except ValueError as e:
             messagebox.showerror("Error", f"Dato inválido: {str(e)}")
+        except OSError as e:
+            window.destroy()
+            self.on_disconnected(e)
     
     def delete_transaction(self):
-        selected_item = self.tree.selection()
+        selected_item = self.table.selection()
         if not selected_item:
             messagebox.showwarning("Advertencia", "Seleccione una transacción para eliminar")
             return
             
         if messagebox.askyesno("Confirmar", "¿Eliminar esta transacción?"):
-            selected_values = self.tree.item(selected_item)["values"]
-
-            for i, t in enumerate(self.transactions):
-                print(f'i:{i}, t:{t}')
-                if (t["Fecha"] == selected_values[0] and 
-                    str(t["Descripción"]) == str(selected_values[4]) and
-                    float(t["Monto"]) == float(selected_values[3][1:])):
-                    del self.transactions[i]
-                    self.save_transactions()
-                    self.update_table()
-                    return
-
-            messagebox.showwarning("Advertencia", "No se pudo encontrar la transacción para eliminar")
+            transaction = self.store.get(selected_item[0])
+            if transaction is None:
+                messagebox.showwarning("Advertencia", "No se pudo encontrar la transacción para eliminar")
+                return
+
+            try:
+                self.store.remove(transaction.id)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            except OSError as e:
+                self.on_disconnected(e)
+                return
+            self.refresh_row(transaction, None)
+            self.request_save()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,75 @@
+import random
+from datetime import date, timedelta
+
+from gestion.charts import RenderCache, auto_bucket, bucket_bounds, build_series, downsample
+from gestion.model import Transaction
+from gestion.rollups import PeriodRollups
+
+START = date(2024, 1, 10)
+
+
+def make_rows(categories, n=400, seed=1):
+    rng = random.Random(seed)
+    return [
+        Transaction(START + timedelta(days=rng.randrange(200)), tipo, categoria, rng.randrange(1, 10_000))
+        for tipo, categoria in (rng.choice(categories) for _ in range(n))
+    ]
+
+
+def test_income_only_categories_do_not_add_an_otras_line():
+    rows = make_rows([("Ingreso", "Ventas"), ("Ingreso", "Sueldo"), ("Gasto", "Comida"), ("Gasto", "Alquiler")])
+    series = build_series(PeriodRollups.from_transactions(rows), START, START + timedelta(days=200), "week")
+    assert sorted(series.categorias) == ["Alquiler", "Comida"]
+
+
+def test_smaller_expense_categories_are_summed_in_otras():
+    gastos = [("Gasto", f"Categoría {i}") for i in range(8)]
+    rows = make_rows(gastos + [("Ingreso", "Ventas")], n=2000)
+    end = START + timedelta(days=200)
+    series = build_series(PeriodRollups.from_transactions(rows), START, end, "month", top=5)
+    assert len(series.categorias) == 6 and "Otras" in series.categorias
+    for i in range(len(series.fechas)):
+        assert sum(values[i] for values in series.categorias.values()) == series.gastos[i]
+    assert sum(series.gastos) == sum(t.monto for t in rows if t.tipo == "Gasto")
+    assert sum(series.ingresos) == sum(t.monto for t in rows if t.tipo == "Ingreso")
+
+
+def test_buckets_match_brute_force_at_the_edges():
+    rows = make_rows([("Ingreso", "Ventas"), ("Gasto", "Comida")])
+    rollups = PeriodRollups.from_transactions(rows)
+    start, end = START + timedelta(days=3), START + timedelta(days=95)
+    for bucket in ("day", "week", "month"):
+        series = build_series(rollups, start, end, bucket)
+        bounds = list(bucket_bounds(start, end, bucket))
+        assert series.fechas == [key for key, _, _ in bounds]
+        assert len(set(series.fechas)) == len(series.fechas)
+        for (_, lo, hi), gastos in zip(bounds, series.gastos):
+            assert gastos == sum(t.monto for t in rows if t.tipo == "Gasto" and lo <= t.fecha < hi)
+
+
+def test_week_buckets_start_on_monday():
+    keys = [key for key, _, _ in bucket_bounds(date(2024, 1, 10), date(2024, 2, 10), "week")]
+    assert all(key.weekday() == 0 for key in keys)
+    assert keys[0] == date(2024, 1, 8)
+
+
+def test_auto_bucket_and_downsample():
+    assert auto_bucket(date(2024, 1, 1), date(2024, 2, 1)) == "day"
+    assert auto_bucket(date(2024, 1, 1), date(2025, 1, 1)) == "week"
+    assert auto_bucket(date(2020, 1, 1), date(2025, 1, 1)) == "month"
+
+    values = [0] * 1000
+    values[337], values[612] = 50, -50
+    points = downsample(values, 100)
+    assert len(points) <= 200
+    assert (337, 50) in points and (612, -50) in points
+    assert [i for i, _ in points] == sorted(i for i, _ in points)
+    assert downsample([1, 2, 3], 100) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_render_cache_evicts_the_least_recently_used():
+    cache = RenderCache(size=2)
+    calls = []
+    for key in ("a", "b", "a", "c", "a", "b"):
+        cache.get(key, lambda: calls.append(key) or key)
+    assert calls == ["a", "b", "c", "b"]
@@ -0,0 +1,52 @@
+import csv
+from datetime import date
+
+import pytest
+
+from gestion.__main__ import main
+from gestion.model import Transaction
+from gestion.storage import write_xlsx
+
+
+def make_book(path, montos):
+    write_xlsx(str(path), [
+        Transaction(date(2024, 3, i + 1), "Ingreso" if i % 2 == 0 else "Gasto", "Ventas", monto, id=f"t-{i}")
+        for i, monto in enumerate(montos)
+    ])
+    return str(path)
+
+
+@pytest.mark.parametrize("line, message", [
+    ("libro.xlsx,2024-13-01,2024-03-31", "línea 2: fecha inválida"),
+    ("libro.xlsx,2024-03-01", "línea 2: se esperan tres columnas"),
+    ("libro.xlsx,2024-03-01,2024-03-31,extra", "línea 2: se esperan tres columnas"),
+])
+def test_batch_list_reports_bad_lines(tmp_path, capsys, line, message):
+    lista = tmp_path / "lista.csv"
+    lista.write_text(f"# libro,desde,hasta\n{line}\n", encoding="utf-8")
+    assert main(["batch", "--lista", str(lista), "-d", str(tmp_path / "out")]) == 2
+    assert message in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+
+
+def test_batch_keeps_list_order_and_sums_every_book(tmp_path):
+    first = make_book(tmp_path / "a.xlsx", [10_000, 2_500, 5_000])
+    second = make_book(tmp_path / "b.xlsx", [1_000])
+    lista = tmp_path / "lista.csv"
+    lista.write_text(
+        f"{first},2024-03-01,2024-03-31\n"
+        f"{second},2024-03-01,2024-03-31\n"
+        f"{first},2024-03-02,2024-03-02\n"
+        f"{tmp_path / 'no-existe.xlsx'},2024-03-01,2024-03-31\n",
+        encoding="utf-8"
+    )
+    resumen = tmp_path / "resumen.csv"
+    assert main(["batch", "--lista", str(lista), "-d", str(tmp_path / "out"), "-p", "2",
+                 "--resumen", str(resumen)]) == 1
+
+    with open(resumen, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["Libro"] for row in rows[:-1]] == [first, second, first, str(tmp_path / "no-existe.xlsx")]
+    assert [row["Transacciones"] for row in rows] == ["3", "1", "1", "0", "5"]
+    assert rows[3]["Error"].startswith("FileNotFoundError")
+    assert (rows[-1]["Ingresos"], rows[-1]["Gastos"]) == ("160.00", "50.00")
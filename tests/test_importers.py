@@ -0,0 +1,133 @@
+from datetime import date
+
+import pytest
+
+from gestion.importers import SIN_CATEGORIA, import_statement, normalize_monto, read_statement, row_to_transaction
+from gestion.storage import XlsxStore, write_xlsx
+
+
+@pytest.mark.parametrize("value, cents", [
+    ("1.500", 150000),
+    ("1,500", 150000),
+    ("1.234.567", 123456700),
+    ("1,234,567", 123456700),
+    ("1.234,56", 123456),
+    ("1,234.56", 123456),
+    ("$1.234,56", 123456),
+    ("$ 1 234,56", 123456),
+    ("(12.50)", -1250),
+    ("(1.500)", -150000),
+    ("-45", -4500),
+    ("+45", 4500),
+    ("12,50", 1250),
+    ("12.5", 1250),
+    ("1,5", 150),
+    (".5", 50),
+    ("0,99", 99),
+    ("12.345,6", 1234560),
+    ("12.345", 1234500),
+    (12.34, 1234),
+    (0.1 + 0.2, 30),
+    (1500, 150000),
+    (-2.5, -250),
+])
+def test_normalize_monto_reads_bank_formats(value, cents):
+    assert normalize_monto(value) == cents
+
+
+@pytest.mark.parametrize("value", [
+    "0.500",
+    "12,3456",
+    "1.234,567",
+    "1,234.567",
+    "1.2.3",
+    "abc",
+    "",
+    "$",
+    12.345,
+])
+def test_normalize_monto_rejects_extra_decimals_and_garbage(value):
+    with pytest.raises(ValueError):
+        normalize_monto(value)
+
+
+@pytest.mark.parametrize("row, tipo, monto", [
+    ({"Fecha": "01/03/2024", "Monto": "-1.500"}, "Gasto", 150000),
+    ({"Fecha": "01/03/2024", "Monto": "1.500"}, "Ingreso", 150000),
+    ({"Fecha": "01/03/2024", "Cargo": "12,50", "Abono": ""}, "Gasto", 1250),
+    ({"Fecha": "01/03/2024", "Cargo": None, "Abono": "12,50"}, "Ingreso", 1250),
+    ({"Fecha": "01/03/2024", "Monto": "12.50", "Tipo": "Débito"}, "Gasto", 1250),
+    ({"Fecha": "01/03/2024", "Monto": "(12.50)", "Tipo": "credit"}, "Ingreso", 1250),
+])
+def test_row_to_transaction_takes_type_from_sign_columns_or_tipo(row, tipo, monto):
+    t = row_to_transaction(row)
+    assert (t.fecha, t.tipo, t.monto) == (date(2024, 3, 1), tipo, monto)
+    assert t.categoria == SIN_CATEGORIA and t.id is None
+
+
+@pytest.mark.parametrize("row", [
+    {"Fecha": "2024-13-01", "Monto": "1"},
+    {"Fecha": "2024-03-01", "Monto": ""},
+    {"Fecha": "2024-03-01", "Monto": "1", "Tipo": "transferencia"},
+    {"Fecha": "2024-03-01", "Monto": "1,234.567"},
+])
+def test_row_to_transaction_rejects_bad_rows(row):
+    with pytest.raises(ValueError):
+        row_to_transaction(row)
+
+
+def test_read_csv_sniffs_delimiter_and_maps_spanish_headers(tmp_path):
+    path = tmp_path / "extracto.csv"
+    path.write_text(
+        "Fecha Operación;Concepto;Cargo;Abono;Saldo\n"
+        "01/03/2024;Supermercado;1.234,56;;10\n"
+        ";;;;\n"
+        "02/03/2024;Nómina;;2.000,00;20\n",
+        encoding="utf-8"
+    )
+    rows = list(read_statement(str(path)))
+    assert [line for line, _ in rows] == [2, 4]
+    assert rows[0][1] == {"Fecha": "01/03/2024", "Descripción": "Supermercado", "Cargo": "1.234,56", "Abono": ""}
+
+
+def test_read_ofx_uses_fitid_as_id(tmp_path):
+    path = tmp_path / "extracto.ofx"
+    path.write_text(
+        "OFXHEADER:100\nDATA:OFXSGML\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240301120000<TRNAMT>-12.50<FITID>A1<NAME>Café<MEMO>Tarjeta\n"
+        "</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240302<TRNAMT>100.00<FITID>A2<NAME>Nómina</STMTTRN>\n"
+        "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n",
+        encoding="latin-1"
+    )
+    rows = [row_to_transaction(row) for _, row in read_statement(str(path))]
+    assert [(t.id, t.fecha, t.tipo, t.monto, t.descripcion) for t in rows] == [
+        ("ofx-A1", date(2024, 3, 1), "Gasto", 1250, "Café - Tarjeta"),
+        ("ofx-A2", date(2024, 3, 2), "Ingreso", 10000, "Nómina"),
+    ]
+
+
+def test_import_statement_reports_errors_and_skips_duplicates(tmp_path):
+    book = str(tmp_path / "libro.xlsx")
+    write_xlsx(book, [])
+    store = XlsxStore(book, close_after=60)
+    store.load()
+    today = date.today().isoformat()
+    path = tmp_path / "extracto.csv"
+    path.write_text(
+        "date,amount,description,id\n"
+        f"{today},\"1,500\",Venta,v-1\n"
+        f"{today},0.345,Tercer decimal,v-2\n"
+        f"{today},-20,Compra,v-1\n"
+        "2016-05-01,10,Año cerrado,v-3\n",
+        encoding="utf-8"
+    )
+    result = import_statement(str(path), store)
+    assert [t.id for t in result.agregadas] == ["v-1"]
+    assert store.get("v-1").monto == 150000
+    assert result.duplicadas == 1
+    assert [line for line, _ in result.errores] == [3, 5]
+
+    again = import_statement(str(path), store)
+    assert again.agregadas == [] and again.duplicadas == 2
+    store.close()
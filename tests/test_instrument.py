@@ -0,0 +1,39 @@
+import tkinter
+
+from gestion.instrument import Instrumentation
+
+
+def test_span_records_only_when_enabled():
+    instrumentation = Instrumentation()
+    with instrumentation.span("carga") as info:
+        info["filas"] = 10
+    assert instrumentation.summary() == {}
+
+    instrumentation.enabled = True
+    for _ in range(3):
+        with instrumentation.span("carga") as info:
+            info["filas"] = 10
+    stat = instrumentation.summary()["carga"]
+    assert stat["llamadas"] == 3 and stat["filas"] == 30
+    assert sum(stat["histograma"].values()) == 3
+    assert len(instrumentation.events) == 3
+
+
+def test_tk_hook_times_callbacks_registered_before_enabling():
+    # Así queda un comando de Tk: el método ya ligado al registrarse
+    def on_click():
+        return "ok"
+
+    instrumentation = Instrumentation()
+    instrumentation.install_tk_hook()
+    try:
+        command = tkinter.CallWrapper(on_click, None, None).__call__
+        assert command() == "ok"
+        assert instrumentation.summary() == {}
+
+        instrumentation.enabled = True
+        assert command() == "ok"
+        [(name, stat)] = instrumentation.summary().items()
+        assert name.endswith(".on_click") and stat["llamadas"] == 1
+    finally:
+        instrumentation.remove_tk_hook()
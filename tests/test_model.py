@@ -0,0 +1,54 @@
+from datetime import date, datetime
+
+import pytest
+
+from gestion.model import Transaction, format_monto, make_totals, parse_fecha, parse_monto
+from gestion.search import SearchIndex
+
+
+def row(**values):
+    base = {"Fecha": "2024-03-01", "Tipo": "Gasto", "Categoría": "Comida", "Monto": 12.5,
+            "Descripción": "Almuerzo", "ID": "t-1"}
+    base.update(values)
+    return base
+
+
+def test_from_row_converts_each_field_once():
+    t = Transaction.from_row(row(Fecha=datetime(2024, 3, 1, 10, 30), Monto="1234.56"))
+    assert t.fecha == date(2024, 3, 1)
+    assert t.monto == 123456
+    assert (t.tipo, t.categoria, t.descripcion, t.id) == ("Gasto", "Comida", "Almuerzo", "t-1")
+
+
+@pytest.mark.parametrize("cell, text", [(1234, "1234"), (12.5, "12.5"), (None, ""), ("", "")])
+def test_from_row_keeps_text_fields_as_text(cell, text):
+    t = Transaction.from_row(row(**{"Descripción": cell, "Categoría": cell, "Tipo": cell}))
+    assert (t.tipo, t.categoria, t.descripcion) == (text, text, text)
+
+
+def test_numeric_description_can_be_searched():
+    t = Transaction.from_row(row(**{"Descripción": 1234}))
+    assert SearchIndex.from_transactions([t]).search("123") == {"t-1"}
+
+
+def test_to_row_round_trips():
+    t = Transaction.from_row(row())
+    assert Transaction.from_row(t.to_row()).to_row() == t.to_row()
+
+
+@pytest.mark.parametrize("value, cents", [(0.1, 10), ("19.99", 1999), (7, 700), (-2.5, -250), ("0.005", 1)])
+def test_parse_monto_returns_exact_cents(value, cents):
+    assert parse_monto(value) == cents
+
+
+@pytest.mark.parametrize("value", ["abc", "nan", "inf", ""])
+def test_parse_monto_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        parse_monto(value)
+
+
+def test_parse_fecha_and_format_monto():
+    assert parse_fecha(" 2024-02-29 ") == date(2024, 2, 29)
+    assert format_monto(-1050) == "$-10.50"
+    assert make_totals(20000, 5000) == (20000, 5000, 15000, 75.0)
+    assert make_totals(0, 5000).margen == 0
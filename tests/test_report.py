@@ -0,0 +1,54 @@
+import re
+from datetime import date, timedelta
+
+from gestion.model import Transaction, make_totals
+from gestion.report import ANCHOS, ReportWriter, write_report
+
+START = date(2024, 1, 1)
+
+
+def make_rows(n, tipo, descripcion="Movimiento"):
+    return [
+        Transaction(START + timedelta(days=i % 365), tipo, "Comida", 1000 + i, f"{descripcion} {i}", id=f"{tipo}-{i}")
+        for i in range(n)
+    ]
+
+
+def page_count(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data.startswith(b"%PDF") and data.rstrip().endswith(b"%%EOF")
+    return int(re.search(rb"/Count (\d+)", data).group(1))
+
+
+def test_report_returns_totals_summed_while_streaming(tmp_path):
+    ingresos, gastos = make_rows(40, "Ingreso"), make_rows(25, "Gasto")
+    path = str(tmp_path / "reporte.pdf")
+    # Los iterables se consumen una sola vez
+    resumen = write_report(path, START, START + timedelta(days=60), iter(ingresos), iter(gastos))
+    assert resumen == make_totals(sum(t.monto for t in ingresos), sum(t.monto for t in gastos))
+    assert page_count(path) >= 2
+
+
+def test_report_without_rows_still_writes_a_summary(tmp_path):
+    path = str(tmp_path / "reporte.pdf")
+    assert write_report(path, START, START, [], []) == make_totals(0, 0)
+    assert page_count(path) == 1
+
+
+def test_many_rows_make_many_pages(tmp_path):
+    path = str(tmp_path / "reporte.pdf")
+    write_report(path, START, START + timedelta(days=365), make_rows(3000, "Ingreso"), [])
+    assert page_count(path) > 50
+
+
+def test_wrapped_description_lines_fit_the_column(tmp_path):
+    writer = ReportWriter(str(tmp_path / "reporte.pdf"))
+    writer.pdf.add_page()
+    writer.pdf.set_font("Times", "", 10)
+    text = "Pago mensual de " + "x" * 200 + " con una descripción bastante larga para varias líneas"
+    lines = writer._wrap_text(text)
+    assert len(lines) > 2
+    assert " ".join(lines).replace(" ", "") == text.replace(" ", "")
+    max_width = ANCHOS[2] - 2 * writer.pdf.c_margin
+    assert all(writer.pdf.get_string_width(line) <= max_width + 1e-6 for line in lines)
@@ -0,0 +1,89 @@
+import json
+import random
+from datetime import date, timedelta
+
+from gestion.model import Transaction, make_totals
+from gestion.rollups import PeriodRollups, next_month
+
+START = date(2023, 11, 15)
+
+
+def make_rows(n, seed):
+    rng = random.Random(seed)
+    return [
+        Transaction(START + timedelta(days=rng.randrange(500)), rng.choice(("Ingreso", "Gasto")),
+                    rng.choice(("Ventas", "Comida", "Alquiler")), rng.randrange(1, 100_000), id=f"r-{seed}-{i}")
+        for i in range(n)
+    ]
+
+
+def brute_force(rows, start, end):
+    result = {}
+    for t in rows:
+        if start <= t.fecha < end:
+            bucket = result.setdefault(t.categoria, [0, 0, 0])
+            bucket[0 if t.tipo == "Ingreso" else 1] += t.monto
+            bucket[2] += 1
+    return result
+
+
+def random_ranges(rng, count):
+    for _ in range(count):
+        start = START + timedelta(days=rng.randrange(-40, 540))
+        yield start, start + timedelta(days=rng.randrange(0, 400))
+
+
+def test_summary_matches_brute_force_after_edits():
+    rng = random.Random(1)
+    rows = make_rows(2000, 1)
+    rollups = PeriodRollups.from_transactions(rows)
+    for t in rng.sample(rows, 300):
+        rollups.remove(t)
+        rows.remove(t)
+    for t in rng.sample(rows, 300):
+        new = Transaction(t.fecha + timedelta(days=rng.randrange(-20, 21)), t.tipo, "Comida",
+                          t.monto + 1, id=t.id)
+        rollups.remove(t)
+        rollups.add(new)
+        rows[rows.index(t)] = new
+
+    for start, end in random_ranges(rng, 200):
+        assert rollups.summary(start, end) == brute_force(rows, start, end), (start, end)
+    # "Mostrar todo"
+    assert rollups.summary(date(1900, 1, 1), date(9999, 1, 1)) == brute_force(rows, date.min, date.max)
+
+
+def test_totals_counts_and_margin():
+    rows = [
+        Transaction(date(2024, 2, 28), "Ingreso", "Ventas", 10_000),
+        Transaction(date(2024, 2, 29), "Gasto", "Comida", 2_500),
+        Transaction(date(2024, 3, 1), "Gasto", "Comida", 1_000),
+    ]
+    rollups = PeriodRollups.from_transactions(rows)
+    assert rollups.totals(date(2024, 2, 1), date(2024, 3, 1)) == (make_totals(10_000, 2_500), 2)
+    assert rollups.totals(date(2024, 3, 1), date(2024, 3, 1)) == (make_totals(0, 0), 0)
+
+
+def test_removing_everything_leaves_empty_tables():
+    rows = make_rows(100, 2)
+    rollups = PeriodRollups.from_transactions(rows)
+    for t in rows:
+        rollups.remove(t)
+    assert (rollups.days, rollups.weeks, rollups.months) == ({}, {}, {})
+
+
+def test_state_round_trip_and_merge():
+    rng = random.Random(3)
+    first, second = make_rows(500, 3), make_rows(500, 4)
+    merged = PeriodRollups.from_transactions(first)
+    state = json.loads(json.dumps(PeriodRollups.from_transactions(second).to_state()))
+    version = merged.version
+    merged.merge(PeriodRollups.from_state(state))
+    assert merged.version > version
+    for start, end in random_ranges(rng, 50):
+        assert merged.summary(start, end) == brute_force(first + second, start, end)
+
+
+def test_next_month_crosses_years():
+    assert next_month(date(2024, 12, 31)) == date(2025, 1, 1)
+    assert next_month(date(2024, 1, 31)) == date(2024, 2, 1)
@@ -0,0 +1,82 @@
+import random
+from datetime import date
+
+from gestion.model import Transaction
+from gestion.search import SearchIndex, plain, tokens
+
+WORDS = ("Café", "cafetería", "Crédito", "pan", "Alquiler", "luz", "agua", "nómina")
+CATEGORIES = ("Comida", "Vivienda", "Crédito bancario")
+
+
+def make_rows(n, seed, prefix="s"):
+    rng = random.Random(seed)
+    return [
+        Transaction(date(2024, 1, 1), rng.choice(("Ingreso", "Gasto")), rng.choice(CATEGORIES),
+                    rng.randrange(1, 500), " ".join(rng.sample(WORDS, 2)), id=f"{prefix}-{i}")
+        for i in range(n)
+    ]
+
+
+def brute_force(rows, text="", categoria=None, tipo=None, minimo=None, maximo=None):
+    result = set()
+    for t in rows:
+        words = tokens(t.descripcion) | tokens(t.categoria)
+        if not all(any(w.startswith(prefix) for w in words) for prefix in tokens(text)):
+            continue
+        if categoria is not None and t.categoria != categoria:
+            continue
+        if tipo is not None and t.tipo != tipo:
+            continue
+        if minimo is not None and t.monto < minimo or maximo is not None and t.monto > maximo:
+            continue
+        result.add(t.id)
+    return result
+
+
+QUERIES = [
+    {"text": "caf"},
+    {"text": "credito"},
+    {"text": "CAFÉ pan"},
+    {"categoria": "Comida", "tipo": "Gasto"},
+    {"minimo": 100, "maximo": 200},
+    {"text": "a", "maximo": 50},
+    {"text": "inexistente"},
+]
+
+
+def test_plain_drops_case_and_accents():
+    assert plain("Crédito NÓMINA") == "credito nomina"
+    assert tokens("Pago, pago; café-bar") == {"pago", "cafe", "bar"}
+
+
+def test_search_matches_brute_force_after_edits():
+    rng = random.Random(1)
+    rows = make_rows(300, 1)
+    index = SearchIndex.from_transactions(rows)
+    for t in rng.sample(rows, 80):
+        index.remove(t)
+        rows.remove(t)
+    for t in make_rows(60, 2, "n"):
+        index.add(t)
+        rows.append(t)
+
+    for query in QUERIES:
+        assert index.search(**query) == brute_force(rows, **query), query
+    assert index.words == sorted(index.postings)
+    assert index.amounts == sorted(t.monto for t in rows)
+
+
+def test_search_without_filters_returns_none():
+    index = SearchIndex.from_transactions(make_rows(10, 3))
+    assert index.search() is None
+    assert index.search("   ") is None
+
+
+def test_removing_last_row_drops_its_words_and_category():
+    t = Transaction(date(2024, 1, 1), "Gasto", "Única", 10, "palabra rara", id="u-1")
+    index = SearchIndex.from_transactions(make_rows(10, 4))
+    index.add(t)
+    assert "Única" in index.category_names()
+    index.remove(t)
+    assert "rara" not in index.postings and "rara" not in index.words
+    assert "Única" not in index.category_names()
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from gestion.model import Transaction
+from gestion.remote import RemoteStore
+from gestion.server import serve
+from gestion.storage import XlsxStore, write_xlsx
+
+
+@pytest.fixture
+def server(tmp_path):
+    # Servidor en un hilo propio sobre un socket Unix; devuelve su dirección
+    path = str(tmp_path / "libro.xlsx")
+    write_xlsx(path, [Transaction(date.today(), "Gasto", "Comida", 100, "inicial", id="t-1")])
+    socket_path = str(tmp_path / "s.sock")
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+        state["task"] = loop.create_task(serve(path, path=socket_path, on_ready=lambda s: ready.set()))
+        try:
+            loop.run_until_complete(state["task"])
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(30)
+    yield f"unix://{socket_path}", path
+    state["loop"].call_soon_threadsafe(state["task"].cancel)
+    thread.join(30)
+
+
+def connect(address):
+    store = RemoteStore(address)
+    store.load()
+    return store
+
+
+def wait_for_changes(store, count):
+    changes = []
+    deadline = time.monotonic() + 5
+    while len(changes) < count and time.monotonic() < deadline:
+        changes += store.take_changes()
+        time.sleep(0.01)
+    return changes
+
+
+def test_changes_reach_the_other_clients(server):
+    address, _ = server
+    a, b = connect(address), connect(address)
+    new = Transaction(date.today(), "Ingreso", "Ventas", 250, "desde A")
+    a.add(new)
+
+    [(old, added)] = wait_for_changes(b, 1)
+    assert old is None and added.id == new.id
+    assert b.get(new.id).monto == 250
+    assert a.take_changes() == []
+    a.close()
+    b.close()
+
+
+def test_stale_edit_is_rejected_instead_of_overwriting(server):
+    address, _ = server
+    a, b = connect(address), connect(address)
+    b.update("t-1", Transaction(date.today(), "Gasto", "Comida", 999, "editada por B"))
+
+    with pytest.raises(ValueError):
+        a.update("t-1", Transaction(date.today(), "Gasto", "Comida", 1, "pisada por A"))
+    with pytest.raises(ValueError):
+        a.remove("t-1")
+
+    [(old, new)] = wait_for_changes(a, 1)
+    assert old.descripcion == "inicial" and new.descripcion == "editada por B"
+    a.remove("t-1")
+    [(old, new)] = wait_for_changes(b, 1)
+    assert old.descripcion == "editada por B" and new is None
+    a.close()
+    b.close()
+
+
+def test_save_writes_the_shared_book(server):
+    address, path = server
+    a = connect(address)
+    a.add(Transaction(date.today(), "Ingreso", "Ventas", 250, "guardada", id="t-2"))
+    a.compact()
+
+    store = XlsxStore(path, read_only=True)
+    store.load()
+    assert store.get("t-2") is not None
+    a.close()
@@ -0,0 +1,62 @@
+import random
+from datetime import date, timedelta
+
+from gestion.model import Transaction
+from gestion.sorting import SORT_KEYS, SortCache
+
+
+def make_rows(n, seed, prefix):
+    rng = random.Random(seed)
+    return [
+        Transaction(date(2024, 1, 1) + timedelta(days=rng.randrange(30)), rng.choice(("Ingreso", "Gasto")),
+                    rng.choice(("Ventas", "Comida", "Álquiler", "alquiler")), rng.randrange(1, 1000),
+                    rng.choice(("Café", "cafe", "Pan", "")), id=f"{prefix}-{i}")
+        for i in range(n)
+    ]
+
+
+def assert_sorted(cache, rows):
+    for (column, descending), order in cache.orders.items():
+        key = SORT_KEYS[column]
+        assert [key(t) for t in order] == sorted((key(t) for t in rows), reverse=descending)
+        assert sorted(t.id for t in order) == sorted(t.id for t in rows)
+
+
+def test_every_order_matches_a_fresh_sort_after_edits():
+    rng = random.Random(4)
+    rows = sorted(make_rows(150, 4, "a"), key=lambda t: t.fecha)
+    cache = SortCache()
+    cache.reset(list(rows))
+    for column in SORT_KEYS:
+        for descending in (False, True):
+            cache.get(column, descending)
+
+    for t in rng.sample(rows, 30):
+        cache.remove(t)
+        rows.remove(t)
+    for t in make_rows(30, 5, "b"):
+        cache.insert(t)
+        rows.append(t)
+    assert_sorted(cache, rows)
+
+
+def test_descending_order_is_the_reverse_of_ascending():
+    rows = sorted(make_rows(50, 6, "a"), key=lambda t: t.fecha)
+    cache = SortCache()
+    cache.reset(rows)
+    ascending = cache.get("Monto")
+    assert cache.get("Monto", True) == ascending[::-1]
+    # Pedirlo de nuevo devuelve el mismo orden ya calculado
+    assert cache.get("Monto", True) is cache.get("Monto", True)
+
+
+def test_remove_finds_the_row_among_equal_keys():
+    day = date(2024, 1, 1)
+    rows = [Transaction(day, "Gasto", "Comida", 100, "igual", id=f"r-{i}") for i in range(6)]
+    cache = SortCache()
+    cache.reset(list(rows))
+    cache.get("Monto", True)
+    cache.remove(rows[3])
+    for order in cache.orders.values():
+        assert [t.id for t in order if t.id == "r-3"] == []
+        assert len(order) == 5
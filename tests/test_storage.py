@@ -0,0 +1,334 @@
+import json
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from gestion.model import Transaction
+from gestion.storage import (DateIndex, TransactionJournal, XlsxStore, read_chunk_headers,
+                             read_chunk_rows, read_xlsx, write_chunk, write_xlsx)
+
+# Un año que ya está cerrado sea cual sea la fecha en que corren las pruebas
+CLOSED_YEAR = 2016
+
+
+def make_transactions(n, year=None, seed=0):
+    rng = random.Random(seed)
+    start = date(year, 1, 1) if year else date.today() - timedelta(days=20)
+    rows = []
+    for i in range(n):
+        fecha = start + timedelta(days=rng.randrange(300 if year else 20))
+        tipo = rng.choice(("Ingreso", "Gasto"))
+        rows.append(Transaction(fecha, tipo, rng.choice(("Ventas", "Comida", "Alquiler")),
+                                rng.randrange(1, 100_000), f"mov {i}", id=f"{year or 'a'}-{i}"))
+    return rows
+
+
+def book(tmp_path, transactions=()):
+    path = str(tmp_path / "libro.xlsx")
+    write_xlsx(path, transactions)
+    return path
+
+
+# Diario
+
+def test_journal_replay_applies_add_update_delete(tmp_path):
+    journal = TransactionJournal(str(tmp_path / "libro.journal"))
+    a, b = make_transactions(2)
+    journal.append("add", t=a.to_row())
+    journal.append("add", t=b.to_row())
+    changed = Transaction(a.fecha, a.tipo, a.categoria, 1, "editada", id=a.id)
+    journal.append("upd", t=changed.to_row())
+    journal.append("del", id=b.id)
+    journal.close()
+
+    transactions = {}
+    journal.replay(transactions)
+    assert list(transactions) == [a.id]
+    assert transactions[a.id].descripcion == "editada"
+    assert journal.entries == 4
+
+
+def test_journal_lines_are_plain_json(tmp_path):
+    journal = TransactionJournal(str(tmp_path / "libro.journal"))
+    journal.append_many("add", ({"t": t.to_row()} for t in make_transactions(3)))
+    journal.close()
+    lines = (tmp_path / "libro.journal").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["add"] * 3
+
+
+def test_journal_torn_line_is_truncated_so_later_appends_survive(tmp_path):
+    path = tmp_path / "libro.journal"
+    journal = TransactionJournal(str(path))
+    a, b = make_transactions(2)
+    journal.append("add", t=a.to_row())
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "t": {"Fe')
+
+    transactions = {}
+    assert journal.replay(transactions) == 1
+    assert list(transactions) == [a.id]
+
+    journal.append("add", t=b.to_row())
+    journal.close()
+    transactions = {}
+    assert journal.replay(transactions) == 0
+    assert list(transactions) == [a.id, b.id]
+
+
+def test_journal_replay_without_repair_leaves_file_alone(tmp_path):
+    path = tmp_path / "libro.journal"
+    path.write_text('{"op": "del", "id": "x"}\n{"op": "ad', encoding="utf-8")
+    before = path.read_bytes()
+
+    journal = TransactionJournal(str(path))
+    assert journal.replay({}, repair=False) == 0
+    assert journal.entries == 1
+    assert path.read_bytes() == before
+
+
+def test_journal_group_commit_syncs_once_per_window(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    journal = TransactionJournal(str(tmp_path / "libro.journal"))
+    journal.COMMIT_WINDOW = 60
+    for t in make_transactions(50):
+        journal.append("add", t=t.to_row())
+    assert synced == [] and journal.unsynced == 50
+
+    journal.sync()
+    assert len(synced) == 1 and journal.unsynced == 0
+    journal.close()
+    assert len(synced) == 1
+
+
+def test_load_replays_journal_on_top_of_xlsx(tmp_path):
+    path = book(tmp_path, make_transactions(10))
+    store = XlsxStore(path)
+    store.load()
+    extra = Transaction(date.today(), "Gasto", "Comida", 500, "sin compactar")
+    store.add(extra)
+    store.remove("a-0")
+    store.close()
+
+    reopened = XlsxStore(path)
+    reopened.load()
+    assert reopened.get(extra.id).monto == 500
+    assert reopened.get("a-0") is None
+    assert len(reopened.transactions) == 10
+
+
+def test_load_finishes_an_interrupted_compaction(tmp_path):
+    path = book(tmp_path, make_transactions(5))
+    store = XlsxStore(path)
+    store.load()
+    extra = Transaction(date.today(), "Gasto", "Comida", 500, "en el diario apartado")
+    store.add(extra)
+    # Corte entre journal.rotate() y la escritura del xlsx
+    store.journal.rotate()
+    store.close()
+    assert os.path.exists(store.journal.rotated_path)
+
+    reopened = XlsxStore(path)
+    reopened.load()
+    assert reopened.get(extra.id) is not None
+    assert not os.path.exists(reopened.journal.rotated_path)
+    assert reopened.journal.entries == 0
+    assert extra.id in read_xlsx(path)[0]
+
+
+def test_load_removes_temp_files_of_interrupted_writes(tmp_path):
+    path = book(tmp_path, make_transactions(5))
+    for temp in (path + ".tmp", str(tmp_path / "libro.snapshot.tmp")):
+        with open(temp, "w") as f:
+            f.write("a medias")
+
+    store = XlsxStore(path)
+    store.load()
+    assert len(store.transactions) == 5
+    assert sorted(os.listdir(tmp_path)) == ["libro.snapshot", "libro.xlsx"]
+
+
+def test_save_replaces_the_xlsx_atomically(tmp_path, monkeypatch):
+    path = book(tmp_path, make_transactions(5))
+    store = XlsxStore(path)
+    store.load()
+    store.add(Transaction(date.today(), "Gasto", "Comida", 500, "nueva"))
+
+    def crash(temp_path, path):
+        raise OSError("corte de luz")
+    monkeypatch.setattr("gestion.storage.replace_file", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    assert len(read_xlsx(path)[0]) == 5
+
+
+def test_read_xlsx_accepts_empty_and_numeric_cells(tmp_path):
+    from openpyxl import Workbook
+    path = str(tmp_path / "libro.xlsx")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Fecha", "Tipo", "Categoría", "Monto", "Descripción", "ID"])
+    sheet.append(["2024-03-01", "Gasto", None, 10, "sin categoría", "x-1"])
+    sheet.append(["2024-03-02", "Gasto", 2024, 10, "categoría numérica", "x-2"])
+    workbook.save(path)
+
+    transactions, missing_ids = read_xlsx(path)
+    assert not missing_ids
+    assert transactions["x-1"].categoria == ""
+    assert transactions["x-2"].categoria == "2024"
+
+
+# Años cerrados
+
+def test_load_merges_a_closing_that_was_cut_short(tmp_path):
+    # El año quedó escrito en su archivo pero el xlsx todavía lo tiene
+    closed = make_transactions(30, CLOSED_YEAR, seed=1)
+    current = make_transactions(10)
+    path = book(tmp_path, closed + current)
+    archive_dir = tmp_path / "libro.archivo"
+    archive_dir.mkdir()
+    write_chunk(str(archive_dir / f"{CLOSED_YEAR}.chunk"), CLOSED_YEAR, closed[:20])
+    with open(archive_dir / f"{CLOSED_YEAR + 1}.chunk.tmp", "wb") as f:
+        f.write(b"a medias")
+
+    store = XlsxStore(path, close_after=60)
+    store.load()
+    chunk = read_chunk_rows(store.chunk_path(CLOSED_YEAR))
+    assert sorted(t.id for t in chunk) == sorted(t.id for t in closed)
+    assert read_chunk_headers(str(archive_dir))[CLOSED_YEAR]["count"] == 30
+    assert sorted(read_xlsx(path)[0]) == sorted(t.id for t in current)
+    assert os.listdir(archive_dir) == [f"{CLOSED_YEAR}.chunk"]
+
+    # Las filas archivadas se leen una sola vez aunque se pidan de nuevo
+    year = (date(CLOSED_YEAR, 1, 1), date(CLOSED_YEAR + 1, 1, 1))
+    assert store.count(*year) == 30
+    assert store.count(*year) == 30
+    with pytest.raises(ValueError):
+        store.add(Transaction(date(CLOSED_YEAR, 5, 1), "Gasto", "Comida", 1, "tarde"))
+
+
+def test_years_are_not_closed_unless_configured(tmp_path):
+    old = make_transactions(5, CLOSED_YEAR)
+    path = book(tmp_path, old)
+    store = XlsxStore(path)
+    store.load()
+    assert store.closed_through is None and store.chunks == {}
+    store.update(old[0].id, Transaction(date(CLOSED_YEAR, 2, 1), "Gasto", "Comida", 1, "corregida"))
+    assert not os.path.exists(store.archive_dir)
+
+
+def test_reopen_returns_an_archived_year_to_the_book(tmp_path, monkeypatch):
+    closed = make_transactions(20, CLOSED_YEAR)
+    current = make_transactions(5)
+    path = book(tmp_path, closed + current)
+    store = XlsxStore(path, close_after=60)
+    store.load()
+    with pytest.raises(ValueError, match="cierre automático"):
+        store.reopen(CLOSED_YEAR)
+    store.close()
+
+    store = XlsxStore(path)
+    store.load()
+    assert store.is_closed(date(CLOSED_YEAR, 5, 1))
+    with pytest.raises(ValueError):
+        store.reopen(CLOSED_YEAR + 1)
+    store.reopen(CLOSED_YEAR)
+    assert not store.is_closed(date(CLOSED_YEAR, 5, 1))
+    assert not os.path.exists(store.chunk_path(CLOSED_YEAR))
+    assert len(store.resident_transactions()) == 25
+    store.add(Transaction(date(CLOSED_YEAR, 5, 1), "Gasto", "Comida", 1, "tarde"))
+    store.close()
+    assert sorted(read_xlsx(path)[0]) == sorted(t.id for t in closed + current)
+
+
+def test_chunk_header_does_not_pickle_classes(tmp_path):
+    closed = make_transactions(50, CLOSED_YEAR, seed=2)
+    path = str(tmp_path / f"{CLOSED_YEAR}.chunk")
+    write_chunk(path, CLOSED_YEAR, closed)
+    with open(path, "rb") as f:
+        data = f.read()
+    assert b"gestion" not in data
+
+    store = XlsxStore(book(tmp_path, []))
+    store.chunks = read_chunk_headers(str(tmp_path))
+    [rollups] = store.archived_rollups()
+    year = (date(CLOSED_YEAR, 1, 1), date(CLOSED_YEAR + 1, 1, 1))
+    assert rollups.totals(*year)[1] == 50
+    assert rollups.totals(*year)[0].gastos == sum(t.monto for t in closed if t.tipo == "Gasto")
+
+
+def test_damaged_chunk_is_reported_by_name(tmp_path):
+    path = book(tmp_path, make_transactions(5))
+    archive_dir = tmp_path / "libro.archivo"
+    archive_dir.mkdir()
+    (archive_dir / f"{CLOSED_YEAR}.chunk").write_bytes(b"no es un pickle")
+
+    with pytest.raises(ValueError, match=f"{CLOSED_YEAR}.chunk"):
+        XlsxStore(path).load()
+    with pytest.raises(ValueError, match=f"{CLOSED_YEAR}.chunk"):
+        read_chunk_rows(str(archive_dir / f"{CLOSED_YEAR}.chunk"))
+
+
+def test_read_only_load_writes_nothing(tmp_path):
+    path = book(tmp_path, make_transactions(20, CLOSED_YEAR) + make_transactions(5))
+    (tmp_path / "libro.journal").write_text('{"op": "del", "id": "a-0"}\n{"op"', encoding="utf-8")
+    (tmp_path / "libro.xlsx.tmp").write_text("otro proceso guardando")
+
+    def files():
+        return {name: (tmp_path / name).read_bytes() for name in sorted(os.listdir(tmp_path))}
+    before = files()
+
+    store = XlsxStore(path, read_only=True)
+    store.load()
+    assert store.get("a-0") is None
+    assert store.count(date.min, date.max) == 24
+    with pytest.raises(ValueError):
+        store.add(Transaction(date.today(), "Gasto", "Comida", 1, "x"))
+    with pytest.raises(ValueError):
+        store.compact()
+    store.close()
+    assert files() == before
+
+
+# Índice por fecha
+
+def test_date_index_stays_sorted_and_in_arrival_order():
+    rng = random.Random(3)
+    rows = make_transactions(200, seed=3)
+    index = DateIndex(rows[:100])
+    index.extend(rows[100:150])
+    for t in rows[150:]:
+        index.insert(t)
+    for t in rng.sample(rows, 40):
+        index.remove(t)
+        rows.remove(t)
+    for t in rng.sample(rows, 40):
+        new = Transaction(t.fecha + timedelta(days=rng.randrange(-5, 6)), t.tipo, t.categoria,
+                          t.monto, t.descripcion, id=t.id)
+        index.replace(t, new)
+        rows[rows.index(t)] = new
+
+    assert index.keys == sorted(index.keys)
+    assert index.keys == [t.fecha for t in index.rows]
+    assert sorted(t.id for t in index.rows) == sorted(t.id for t in rows)
+
+    start, end = date.today() - timedelta(days=10), date.today()
+    expected = {t.id for t in rows if start <= t.fecha < end}
+    assert {t.id for t in index.range(start, end)} == expected
+    assert index.count(start, end) == len(expected)
+    with pytest.raises(KeyError):
+        index.remove(Transaction(date.today(), "Gasto", "Comida", 1, id="no-existe"))
+
+
+def test_date_index_keeps_same_day_rows_in_arrival_order():
+    day = date(2024, 3, 1)
+    rows = [Transaction(day, "Gasto", "Comida", i + 1, id=f"d-{i}") for i in range(5)]
+    index = DateIndex(rows[:2])
+    index.insert(rows[2])
+    index.extend(rows[3:])
+    assert [t.id for t in index.range(day, day + timedelta(days=1))] == [t.id for t in rows]
+    assert index.range(day + timedelta(days=1), day) == []
+    assert index.count(day + timedelta(days=1), day) == 0